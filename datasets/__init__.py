@@ -1,5 +1,5 @@
 from .scripts.tfrecords2 import input_fn, get_test, get_valid, get_train, tfrecords_builder
-from .scripts.tfrecords2 import input_with_embeddings_fn
+from .scripts.tfrecords2 import dataset_with_embeddings_fn, get_shard_size
 from .scripts.propbankbr import propbankbr_synthactic_1_1, propbankbr_dependency_1_1, propbankbr_parser
 from .scripts.propbankbr import propbankbr_iob2arg, propbankbr_t2arg, propbankbr_arg2t, propbankbr_arg2iob
 from .scripts.propbankbr import propbankbr_arg2se
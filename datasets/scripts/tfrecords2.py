@@ -4,7 +4,7 @@ Created on Jan 25, 2018
 
     Generates and reads tfrecords
         * Generates train, valid, test datasets
-        * Provides input_with_embeddings_fn that acts as a feeder
+        * Provides dataset_with_embeddings_fn that acts as a feeder
     EX.:
     # Recover a propbank representation
     > from models.propbank_encoder import PropbankEncoder
@@ -39,6 +39,7 @@ Created on Jan 25, 2018
 '''
 import collections
 from collections import defaultdict
+import os
 import sys
 import re
 import math
@@ -52,6 +53,13 @@ TF_CONTEXT_FEATURES = {
     'L': tf.FixedLenFeature([], tf.int64)
 }
 
+# Every file reader fetches this many bytes per read (8 MiB)
+TF_RECORD_BUFFER_NBYTES = 2 ** 23
+
+AUTOTUNE = tf.data.experimental.AUTOTUNE
+parallel_interleave = tf.data.experimental.parallel_interleave
+bucket_by_sequence_length = tf.data.experimental.bucket_by_sequence_length
+
 
 def get_test(embeddings, input_labels, output_labels,
              embeddings_model, lang='pt', version='1.0'):
@@ -106,7 +114,9 @@ def tfrecords_extract(ds_type, embeddings, input_labels, output_labels,
                       embeddings_model, lang='pt', version='1.0'):
     '''Converts the contents of ds_type (train, valid, test) into array
 
-    Acts as a wrapper for the function tsr2npy
+    Acts as a wrapper for the function tsr2npy -- targets are no
+    longer one-hot encoded: callers must expand the class indices
+    and ignore the -1 paddings
 
     Arguments:
         ds_type {str} -- train, valid, test
@@ -116,7 +126,8 @@ def tfrecords_extract(ds_type, embeddings, input_labels, output_labels,
 
     Returns:
         inputs  {numpy.array} --  NUM_RECORDS X MAX_TIME X FEATURE_SIZE
-        targets {numpy.array} --  NUM_RECORDS X MAX_TIME X TARGET_SIZE
+        targets {numpy.array} --  a 2D int32 array NUM_RECORDS X MAX_TIME
+            class indices padded with -1
         lengths {list<int>} -- a list holding the lengths for every proposition
         others {numpy.array} -- a 3D array representing the indexes
 
@@ -180,8 +191,8 @@ def tsr2npy(dataset_path, embeddings, dataset_size, input_labels, output_labels,
     Returns:
         inputs  {numpy.array} -- a 3D array size
             NUM_RECORDS X MAX_TIME X FEATURE_SIZE
-        targets {numpy.array} -- a 3D array size
-            NUM_RECORDS X MAX_TIME X TARGET_SIZE
+        targets {numpy.array} -- a 2D int array size
+            NUM_RECORDS X MAX_TIME class indices padded with -1
         lengths {numpy.array} -- a 1D array size
             lengths for every proposition
         descriptors {list<str>} -- a 3D array NUM_RECORDS X MAX_TIME 
@@ -193,11 +204,13 @@ def tsr2npy(dataset_path, embeddings, dataset_size, input_labels, output_labels,
     with tf.name_scope('pipeline'):
 
         EMBS = tf.Variable(embeddings, trainable=False, name='embeddings')
-        
-        X, T, L, D = input_with_embeddings_fn(
+
+        dataset = dataset_with_embeddings_fn(
             EMBS, [dataset_path], dataset_size, 1, input_labels, output_labels,
             shuffle=False
         )
+        iterator = dataset.make_initializable_iterator()
+        X, T, L, D = iterator.get_next()
 
     init_op = tf.group(
         tf.global_variables_initializer(),
@@ -206,22 +219,16 @@ def tsr2npy(dataset_path, embeddings, dataset_size, input_labels, output_labels,
 
     with tf.Session() as session:
         session.run(init_op)
-        coord = tf.train.Coordinator()
-        threads = tf.train.start_queue_runners(coord=coord)
+        session.run(iterator.initializer)
 
         # This first loop instanciates validation set
         try:
-            while not coord.should_stop():
+            while True:
                 inputs, targets, times, descriptors = session.run([X, T, L, D])
 
         except tf.errors.OutOfRangeError:
             print(msg)
 
-        finally:
-            # When done, ask threads to stop
-            coord.request_stop()
-            coord.join(threads)
-
     return inputs, targets, times, descriptors
 
 
@@ -258,30 +265,25 @@ def tsr2npy2(dataset_path, dataset_size, input_labels,
 
     with tf.Session() as session:
         session.run(init_op)
-        coord = tf.train.Coordinator()
-        threads = tf.train.start_queue_runners(coord=coord)
 
         # This first loop instanciates validation set
         try:
-            while not coord.should_stop():
+            while True:
                 inputs, targets, times, descriptors = session.run([X, T, L, D])
 
         except tf.errors.OutOfRangeError:
             print(msg)
 
-        finally:
-            # When done, ask threads to stop
-            coord.request_stop()
-            coord.join(threads)
-
     return inputs, targets, times, descriptors
 
 
 def input_fn(filenames, batch_size, num_epochs,
-             input_labels, output_labels, shuffle=True):
+             input_labels, output_labels, shuffle=True, cache_path='',
+             fetch_factor=8):
     '''Provides I/O from protobufs to numpy arrays
 
-    https://www.tensorflow.org/api_guides/python/reading_data#Preloaded_data
+    Parsing runs on parallel calls and batches are prefetched -- the
+    tensors are read straight from the pipeline without feed_dict
 
     Arguments:
         filenames {list<str>} -- list containing tfrecord file names
@@ -294,7 +296,10 @@ def input_fn(filenames, batch_size, num_epochs,
     Keyword Arguments:
         shuffle {bool} -- If true will shuffle the proposition for 
             each epoch (default: {True})
-        dim_dict {dict} -- provides the dimensions for each feature
+        cache_path {str} -- Parsed propositions are cached on this file
+            or in memory if empty (default: {''})
+        fetch_factor {int} -- Propositions are reshuffled in memory on
+            blocks of fetch_factor batches (default: {8})
 
     Returns:
         X_batch {numpy.array} -- a 3D array size
@@ -306,50 +311,50 @@ def input_fn(filenames, batch_size, num_epochs,
         D_batch  {list<str>} -- a 3D array NUM_RECORDS X MAX_TIME 
             index of tokens
     '''
-    # File names must be of the same pattern
-    def get_embs():
-        sep = re.compile('_|\.')
-        search_list = sep.split(filenames[0])
-        # 3 latters followed by 2-4 numbers
-        matcher = re.compile('^([a-z]{3}[0-9]{2,4})$')
-        key_list = [s for s in search_list if matcher.match(s)]
-
-        return key_list[0]
-
-    embs_model = get_embs()
-    filename_queue = tf.train.string_input_producer(
-        filenames,
-        num_epochs=num_epochs,
-        shuffle=shuffle
-    )
-
-    sequence_labels = input_labels + output_labels
-
-    context_features, sequence_features = _read_and_decode(
-        filename_queue, embs_model, sequence_labels
-    )
-
-    X, T, L, D = _protobuf_process(
-        context_features,
-        sequence_features,
-        input_labels,
-        output_labels,
-        embs_model
-    )
+    embs_model, lang = _get_info(filenames)
+    sequence_labels = list(input_labels + output_labels)
 
-    min_after_dequeue = 10000
-    capacity = min_after_dequeue + 3 * batch_size
+    def parse_fn(serialized_example):
+        context_features, sequence_features = _parse_sequence_example(
+            serialized_example, embs_model, sequence_labels, lang
+        )
 
+        return _protobuf_process(
+            context_features,
+            sequence_features,
+            input_labels,
+            output_labels,
+            embs_model,
+            lang
+        )
 
-    X_batch, T_batch, L_batch, D_batch = tf.train.batch(
-        [X, T, L, D],
-        batch_size=batch_size,
-        capacity=capacity,
-        dynamic_pad=True,
-        allow_smaller_final_batch=True
-    )
-    # D_batch is the index
-    D_batch = tf.cast(tf.squeeze(D_batch, axis=2), tf.int64)
+    def squeeze_fn(X, T, L, D):
+        # D_batch is the index
+        return X, T, L, tf.cast(tf.squeeze(D, axis=2), tf.int64)
+
+    dataset = tf.data.Dataset.from_tensor_slices(filenames)
+    # Reads every file concurrently -- sloppy allows out of order records
+    dataset = dataset.apply(parallel_interleave(
+        tf.data.TFRecordDataset, cycle_length=len(filenames), sloppy=True))
+    dataset = dataset.map(parse_fn, num_parallel_calls=AUTOTUNE)
+    # Parses once -- the following epochs are read from the cache
+    if num_epochs is None or num_epochs > 1:
+        dataset = dataset.cache(cache_path)
+    # Shuffles after the cache -- otherwise every epoch replays its order
+    if shuffle:
+        dataset = dataset.shuffle(
+            buffer_size=fetch_factor * batch_size,
+            reshuffle_each_iteration=True)
+    dataset = dataset.repeat(num_epochs)
+    dataset = dataset.padded_batch(
+        batch_size, padded_shapes=dataset.output_shapes)
+    dataset = dataset.map(squeeze_fn)
+    dataset = _with_options(dataset)
+    # Batches are produced while the previous step runs
+    dataset = dataset.prefetch(AUTOTUNE)
+
+    X_batch, T_batch, L_batch, D_batch = \
+        dataset.make_one_shot_iterator().get_next()
     return X_batch, T_batch, L_batch, D_batch
 
 
@@ -414,24 +419,18 @@ def _protobuf_process(
 
 
 
-def _read_and_decode(filename_queue, embeddings_model, sequence_labels, lang):
+def _parse_sequence_example(serialized_example, embeddings_model,
+                            sequence_labels, lang):
     '''
-        Decodes a serialized .tfrecords containing sequences
+        Parses a serialized SequenceExample containing sequences
         args
-            filename_queue.: list of strings containing file names which are added to queue
+            serialized_example.: scalar string tensor holding the protobuf
 
         returns
             context_features.: features that are held constant thru sequence ex: time, sequence id
 
             sequence_features.: features that are held variable thru sequence ex: word_idx
-
-    ref .: https://github.com/tensorflow/tensorflow/issues/976
     '''
-
-    reader = tf.TFRecordReader()
-    _, serialized_example = reader.read(filename_queue)
-
-
     cnf_dict = conf.get_config(embeddings_model, lang=lang)
 
     def make_feature(key):
@@ -468,13 +467,17 @@ def read_sequence_example(file_path):
         return ex
 
 
-def input_with_embeddings_fn(
-    EMBS, filenames, batch_size, num_epochs, input_labels, output_labels, shuffle=True):
-    '''Provides I/O from protobufs to numpy arrays
+def dataset_with_embeddings_fn(
+    EMBS, filenames, batch_size, num_epochs, input_labels, output_labels,
+    shuffle=True, cache_path='', fetch_factor=8, num_shards=1, shard_index=0,
+    bucket_boundaries=None, pad_to_boundary=False):
+    '''Provides I/O from protobufs to a tf.data.Dataset
 
-    https://www.tensorflow.org/api_guides/python/reading_data#Preloaded_data
+    Parsing runs on parallel calls and batches are prefetched -- so the
+    input pipeline overlaps the training step instead of running before it
 
     Arguments:
+        EMBS {tf.Variable} -- matrix [VOCAB_SIZE, EMBEDDING_SIZE] word embeddings
         filenames {list<str>} -- list containing tfrecord file names
         batch_size {int} -- integer containing batch size
         num_epochs {int} -- integer representing the total number 
@@ -485,63 +488,220 @@ def input_with_embeddings_fn(
     Keyword Arguments:
         shuffle {bool} -- If true will shuffle the proposition for 
             each epoch (default: {True})
-        dim_dict {dict} -- provides the dimensions for each feature
+        cache_path {str} -- Parsed propositions are cached on this file
+            or in memory if empty (default: {''})
+        fetch_factor {int} -- Propositions are reshuffled in memory on
+            blocks of fetch_factor batches (default: {8})
+        num_shards {int} -- Number of replicas reading filenames (default: {1})
+        shard_index {int} -- This replica's shard -- every replica gets
+            a disjoint subset of the propositions (default: {0})
+        bucket_boundaries {list<int>} -- Batches propositions of similar
+            lengths together -- reducing the padded time steps. If None
+            propositions are batched in arrival order (default: {None})
+        pad_to_boundary {bool} -- Pads bucketed batches up to their
+            boundary so that a compiled graph only sees a few time
+            lengths (default: {False})
 
     Returns:
-        X_batch {numpy.array} -- a 3D array size
-            NUM_RECORDS X MAX_TIME X FEATURE_SIZE
-        T_batch  {numpy.array} -- a 3D array size
-            NUM_RECORDS X MAX_TIME X TARGET_SIZE                        .:
-        L_batch  {numpy.array} -- a 1D array size
-            lengths for every proposition
-        D_batch  {list<str>} -- a 3D array NUM_RECORDS X MAX_TIME 
-            index of tokens
+        dataset {tf.data.Dataset} -- yields (X_batch, T_batch, L_batch, D_batch)
+            X_batch -- a 3D tensor BATCH_SIZE X MAX_TIME X FEATURE_SIZE
+            T_batch -- a int32 tensor BATCH_SIZE X MAX_TIME [X NUM_TARGETS]
+                class indices padded with -1
+            L_batch -- a 1D tensor lengths for every proposition
+            D_batch -- a 2D tensor BATCH_SIZE X MAX_TIME index of tokens
     '''
-    def get_info():
-        sep = re.compile('_|\.')
-        search_list = sep.split(filenames[0])
-        # 3 latters followed by 2-4 numbers
-        matcher = re.compile('^([a-z]{3}[0-9]{2,4})$')
-        key_list = [s for s in search_list if matcher.match(s)]
-
-        lang = 'pt' if 'pt' in filenames[0].split('/') else 'en'
-        return key_list[0], lang
+    embs_model, lang = _get_info(filenames)
+    sequence_labels = list(input_labels + output_labels)
 
-    embs_model, lang = get_info()
+    def parse_fn(serialized_example):
+        context_features, sequence_features = _parse_sequence_example(
+            serialized_example, embs_model, sequence_labels, lang
+        )
 
+        return _protobuf_with_embeddings_process(
+            EMBS,
+            context_features,
+            sequence_features,
+            input_labels,
+            output_labels,
+            embs_model,
+            lang
+        )
 
-    filename_queue = tf.train.string_input_producer(
-        filenames, num_epochs=num_epochs, shuffle=shuffle
+    block_size = fetch_factor * batch_size
+    # Every replica must see the same file order to get disjoint shards
+    filenames = sorted(filenames)
+    # Shards whole files when there are enough of them
+    shard_files = len(filenames) >= num_shards
+    # Sharding records needs the interleaved order to be reproducible
+    shard_records = num_shards > 1 and not shard_files
+    num_files = len(filenames) // num_shards if shard_files else len(filenames)
+    cycle_length = max(min(num_files, os.cpu_count()), 1)
+
+    def read_fn(filename):
+        # Large sequential reads -- bounded regardless of batch_size
+        return tf.data.TFRecordDataset(
+            filename, buffer_size=TF_RECORD_BUFFER_NBYTES)
+
+    # Reads the shards concurrently -- sloppy allows out of order records
+    dataset = tf.data.Dataset.from_tensor_slices(filenames)
+    if num_shards > 1 and shard_files:
+        dataset = dataset.shard(num_shards, shard_index)
+    dataset = dataset.apply(parallel_interleave(
+        read_fn, cycle_length=cycle_length, sloppy=not shard_records))
+    if shard_records:
+        dataset = dataset.shard(num_shards, shard_index)
+    dataset = dataset.map(parse_fn, num_parallel_calls=AUTOTUNE)
+    # Parses once -- the following epochs are read from the cache
+    # a single pass would only hold a copy of the dataset in memory
+    if num_epochs is None or num_epochs > 1:
+        dataset = dataset.cache(cache_path)
+    if shuffle:
+        dataset = dataset.shuffle(
+            buffer_size=block_size, reshuffle_each_iteration=True)
+    dataset = dataset.repeat(num_epochs)
+    # Targets are padded with -1 -- one-hot encodes it as a zero vector
+    padding_values = (
+        tf.constant(0, dtype=tf.float32),
+        tf.constant(-1, dtype=tf.int32),
+        tf.constant(0, dtype=tf.int32),
+        tf.constant(0, dtype=tf.int64)
     )
-    sequence_labels = list(input_labels + output_labels)
+    if bucket_boundaries:
+        dataset = dataset.apply(bucket_by_sequence_length(
+            lambda X, T, L, D: L,
+            bucket_boundaries,
+            [batch_size] * (len(bucket_boundaries) + 1),
+            padded_shapes=dataset.output_shapes,
+            padding_values=padding_values))
+        if pad_to_boundary:
+            dataset = dataset.map(
+                _pad_to_boundary_fn(bucket_boundaries, padding_values),
+                num_parallel_calls=AUTOTUNE)
+    else:
+        dataset = dataset.padded_batch(
+            batch_size, padded_shapes=dataset.output_shapes,
+            padding_values=padding_values)
 
-    context_features, sequence_features = _read_and_decode(
-        filename_queue, embs_model, sequence_labels, lang
-    )
+    dataset = _with_options(dataset, deterministic=shard_records)
+    # Prefetch after batching -- whole batches are kept ready
+    return dataset.prefetch(AUTOTUNE)
 
-    X, T, L, D = _protobuf_with_embeddings_process(
-        EMBS,
-        context_features,
-        sequence_features,
-        input_labels,
-        output_labels,
-        embs_model,
-        lang
-    )
 
-    min_after_dequeue = 10000
-    capacity = min_after_dequeue + 3 * batch_size
+def get_shard_size(filenames, dataset_size, num_shards=1, shard_index=0):
+    '''Number of propositions read by a replica
 
+    Mirrors the sharding on dataset_with_embeddings_fn -- whole files
+    are counted when they are sharded
 
-    X_batch, T_batch, L_batch, D_batch = tf.train.batch(
-        [X, T, L, D],
-        batch_size=batch_size,
-        capacity=capacity,
-        dynamic_pad=True,
-        allow_smaller_final_batch=True
-    )
-    return X_batch, T_batch, L_batch, D_batch
+    Arguments:
+        filenames {list<str>} -- list containing tfrecord file names
+        dataset_size {int} -- total number of propositions
+
+    Keyword Arguments:
+        num_shards {int} -- Number of replicas reading filenames (default: {1})
+        shard_index {int} -- This replica's shard (default: {0})
 
+    Returns:
+        shard_size {int} -- propositions on shard_index
+    '''
+    if num_shards == 1:
+        return dataset_size
+
+    filenames = sorted(filenames)
+    if len(filenames) >= num_shards:
+        return sum(
+            sum(1 for _ in tf.python_io.tf_record_iterator(filename))
+            for filename in filenames[shard_index::num_shards])
+
+    return len(range(shard_index, dataset_size, num_shards))
+
+
+def _pad_to_boundary_fn(bucket_boundaries, padding_values):
+    '''Pads the time axis of a batch up to the next bucket boundary
+
+    Batches longer than the last boundary are left as they are
+
+    Arguments:
+        bucket_boundaries {list<int>} -- sorted time boundaries
+        padding_values {tuple<tf.constant>} -- padding for X, T, L, D
+
+    Returns:
+        pad_fn {function} -- maps (X, T, L, D) batches
+    '''
+    boundaries = tf.constant(sorted(bucket_boundaries), dtype=tf.int32)
+
+    def pad_fn(X, T, L, D):
+        time = tf.shape(X)[1]
+        # The smallest boundary that fits -- or time itself
+        larger = tf.boolean_mask(boundaries, boundaries >= time)
+        target = tf.concat((larger, [time]), axis=0)[0]
+        pad = target - time
+
+        def pad_time(tensor, value):
+            paddings = [[0, 0], [0, pad]] + [[0, 0]] * (len(tensor.shape) - 2)
+            padded = tf.pad(tensor, paddings, constant_values=value)
+            # Keeps the static dimensions other than time
+            padded.set_shape(tensor.shape[:1].concatenate(
+                [None]).concatenate(tensor.shape[2:]))
+            return padded
+
+        X = pad_time(X, padding_values[0])
+        T = pad_time(T, padding_values[1])
+        D = pad_time(D, padding_values[3])
+        return X, T, L, D
+
+    return pad_fn
+
+
+def _with_options(dataset, deterministic=False):
+    '''Lets tf.data trade record order for throughput
+
+    Propositions are identified by their index -- so the order
+    they arrive in is irrelevant
+
+    Arguments:
+        dataset {tf.data.Dataset} -- input pipeline
+
+    Keyword Arguments:
+        deterministic {bool} -- Keeps the record order -- required when
+            records are sharded after being read (default: {False})
+
+    Returns:
+        dataset {tf.data.Dataset} -- same pipeline with options applied
+    '''
+    options = tf.data.Options()
+    options.experimental_deterministic = deterministic
+    options.experimental_optimization.map_and_batch_fusion = True
+
+    try:  # tensorflow 1.14
+        options.experimental_threading.private_threadpool_size = os.cpu_count()
+    except AttributeError:
+        pass
+
+    return dataset.with_options(options)
+
+
+def _get_info(filenames):
+    '''Recovers the embeddings model and language from the file names
+
+    File names must be of the same pattern
+
+    Arguments:
+        filenames {list<str>} -- list containing tfrecord file names
+
+    Returns:
+        embs_model {str} -- embeddings model ex: glo50
+        lang {str} -- `pt` or `en`
+    '''
+    sep = re.compile('_|\.')
+    search_list = sep.split(filenames[0])
+    # 3 latters followed by 2-4 numbers
+    matcher = re.compile('^([a-z]{3}[0-9]{2,4})$')
+    key_list = [s for s in search_list if matcher.match(s)]
+
+    lang = 'pt' if 'pt' in filenames[0].split('/') else 'en'
+    return key_list[0], lang
 
 
 def _protobuf_with_embeddings_process(
@@ -559,7 +719,7 @@ def _protobuf_with_embeddings_process(
 
         returns:    
             X                                   .: 
-            T                       .: 
+            T                       .: int32 class indices MAX_TIME [X NUM_TARGETS]
             L                               .: 
             D               .:
 
@@ -572,8 +732,7 @@ def _protobuf_with_embeddings_process(
     config_dict = conf.get_config(embs_model, lang=lang)
 
     # Fetch only context variable the length of the proposition
-    L = context_features['L']
-    output_dim = max([config_dict[lbl]['dims'] for lbl in output_labels])
+    L = tf.cast(context_features['L'], tf.int32)
 
     labels_list = list(input_labels + output_labels)
     labels_list.append('INDEX')
@@ -581,6 +740,13 @@ def _protobuf_with_embeddings_process(
     for key in labels_list:
         ind = sequence_features[key]
 
+        if key in output_labels and key not in input_labels:
+            # Targets are class indices -- the one-hot
+            # expansion is performed by the computation graph
+            ind = tf.cast(tf.squeeze(ind, axis=1), tf.int32)
+            sequence_outputs.append(ind)
+            continue
+
         if config_dict[key]['type'] == 'text':
             ind = tf.nn.embedding_lookup(EMBS, ind)
             ind = tf.squeeze(ind, axis=1)
@@ -598,15 +764,6 @@ def _protobuf_with_embeddings_process(
         if key in input_labels:
             sequence_inputs.append(ind)
 
-        elif key in output_labels:
-            # [0, 0] -- top, bottom [0, x] -- left right
-            pad_sz = output_dim - config_dict[key]['dims']
-            paddings = tf.constant([[0, 0], [0, pad_sz]])
-            # fills v with the right amounts of zero in orde
-            ind = tf.pad(ind, paddings, 'CONSTANT')
-
-            sequence_outputs.append(ind)
-
         elif key in ('INDEX',):
             sequence_descriptors = ind
 
@@ -615,7 +772,7 @@ def _protobuf_with_embeddings_process(
     if len(sequence_outputs) == 1:
         T = sequence_outputs[0]
     else:
-        T = tf.stack(sequence_outputs, axis=2)
+        T = tf.stack(sequence_outputs, axis=1)
     D = sequence_descriptors
 
     return X, T, L, D
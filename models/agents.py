@@ -6,11 +6,23 @@ Created on Oct 4, 2018
     and tensorflow computation grapth
 '''
 import json
+import logging
+import re
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from functools import lru_cache
 from shutil import copyfile
 import tensorflow as tf
+from tensorflow.core.protobuf import rewriter_config_pb2
+try:  # tensorflow 1.14
+    from tensorflow.python.compiler.xla.jit import experimental_jit_scope as jit_scope
+except ImportError:
+    # tensorflow 1.13
+    from tensorflow.contrib.compiler.jit import experimental_jit_scope as jit_scope
 
 import config
+from datasets import get_shard_size
 from models.conll_evaluator import ConllEvaluator
 from models.propbank_encoder import PropbankEncoder
 from models.labelers import Labeler, DualLabeler
@@ -29,6 +41,21 @@ TARGET_LABELS = ['IOB']
 
 HIDDEN_LAYERS = [16, 16]
 
+BUCKET_BOUNDARIES = [20, 40, 60, 100, 150]
+
+# Checkpoints saved before the variables were renamed -- maps a
+# graph variable name (and its optimizer slots) to the old name
+LEGACY_VARIABLE_NAMES = (
+    # Wo and bo were unnamed tf.Variables
+    (re.compile(r'/(score[^/]*)/Wo(?=/|$)'), r'/\1/Variable'),
+    (re.compile(r'/(score[^/]*)/bo(?=/|$)'), r'/\1/Variable_1'),
+    # BI layers were bidirectional_dynamic_rnn calls under h<i>
+    (re.compile(r'/stack_bidirectional_rnn/cell_(\d+)/'), r'/h\1/'),
+)
+
+# Handlers are configured by the entry point -- see srl.py
+logger = logging.getLogger(__name__)
+
 
 
 class AgentMeta(type):
@@ -149,11 +176,37 @@ class SRLAgent(metaclass=AgentMeta):
             chunks {bool} --  (default: {False})
 
             recon_depth {number} -- [description] (default: {-1})
+
+            fetch_factor {int} -- Training batches reshuffled together
+                                  in memory (default: {8})
+
+            num_shards {int} -- Replicas sharing the training set
+                                  (default: {1})
+
+            shard_index {int} -- Training shard for this replica
+                                  (default: {0})
+
+            xla {bool} -- Compiles the labeler with XLA -- training
+                                  batches are padded up to their bucket
+                                  boundary (default: {False})
+
+            mixed_precision {bool} -- Trains in float16 with float32
+                                  weights (default: {False})
+
+            bucket_boundaries {list<int>} -- Training batches are made of
+                                  propositions of similar lengths -- None
+                                  disables it (default: {BUCKET_BOUNDARIES})
         '''
 
         # ckpt_dir should be set by SrlAgent#load
         ckpt_dir = kwargs.get('ckpt_dir', None)
         kfold = kwargs.get('kfold', False)
+        fetch_factor = kwargs.get('fetch_factor', 8)
+        num_shards = kwargs.get('num_shards', 1)
+        shard_index = kwargs.get('shard_index', 0)
+        xla = kwargs.get('xla', False)
+        mixed_precision = kwargs.get('mixed_precision', False)
+        bucket_boundaries = kwargs.get('bucket_boundaries', BUCKET_BOUNDARIES)
         ctx_p = self._ctx_p(input_labels)
         chunks = 'SHALLOW_CHUNKS' in input_labels
 
@@ -174,7 +227,8 @@ class SRLAgent(metaclass=AgentMeta):
                 embeddings_trainable=False,
                 embeddings_model=embeddings_model, rec_unit=rec_unit,
                 epochs=epochs, chunks=chunks, recon_depth=recon_depth,
-                version=version, lang=lang, batch_size=batch_size)
+                version=version, lang=lang, batch_size=batch_size,
+                xla=xla, mixed_precision=mixed_precision)
             self.target_dir = target_dir
             self._restore_session = False
 
@@ -186,7 +240,7 @@ class SRLAgent(metaclass=AgentMeta):
             'deep', embeddings_model, lang=lang, version=version)
 
         # This list should have one argument only
-        propbank_encoder = PropbankEncoder.recover(propbank_path)
+        propbank_encoder = _load_encoder(propbank_path)
 
         self.input_labels = input_labels
         self.target_labels = target_labels
@@ -196,6 +250,7 @@ class SRLAgent(metaclass=AgentMeta):
         self.batch_size = batch_size
         self.epochs = epochs
         self.embeddings_trainable = embeddings_trainable
+        self.xla = xla
 
         self.embeddings = propbank_encoder.embeddings
 
@@ -207,38 +262,54 @@ class SRLAgent(metaclass=AgentMeta):
         else:
             self.best_validation_rate = 0.0
 
-        cnf_dict = config.get_config(embeddings_model, lang=lang)
-        X_shape = get_xshape(input_labels, len(self.embeddings[0]), cnf_dict)
-        T_shape = get_tshape(target_labels, cnf_dict)
-        print('trainable embeddings?', embeddings_trainable)
-        print('X_shape', X_shape)
-        print('T_shape', T_shape)
+        cnf_dict = _get_config(embeddings_model, lang)
+        X_shape, T_shape = _get_shapes(
+            tuple(input_labels), tuple(target_labels),
+            len(self.embeddings[0]), embeddings_model, lang)
+        logger.info('trainable embeddings? %s', embeddings_trainable)
+        logger.info('X_shape %s', X_shape)
+        logger.info('T_shape %s', T_shape)
 
 
 
 
 
         # Builds the computation graph
-        self.X = tf.placeholder(tf.float32, shape=X_shape, name='X')
-        self.T = tf.placeholder(tf.float32, shape=T_shape, name='T')
-        self.L = tf.placeholder(tf.int32, shape=(None,), name='L')
+        # Inputs come straight from the streamers' iterators -- the
+        # handle selects which streamer feeds the graph
+        self.handle = tf.placeholder(tf.string, shape=[], name='handle')
+        with tf.device('/cpu:0'):
+            iterator = tf.data.Iterator.from_string_handle(
+                self.handle,
+                (tf.float32, tf.int32, tf.int32, tf.int64),
+                (X_shape, T_shape, [None], [None, None])
+            )
+            self.X, T, self.L, self.I = iterator.get_next()
+        self._handles = {}
+
+        # Targets are streamed as class indices
+        targets_size = [cnf_dict[lbl]['dims'] for lbl in target_labels]
+        self.T = tf.one_hot(T, depth=max(targets_size), dtype=tf.float32, axis=2)
 
-        self.WE = tf.Variable(self.embeddings, trainable=self.embeddings_trainable, name='embeddings')
+        # Embeddings are looked up by the input pipeline on the host
+        with tf.device('/cpu:0'):
+            self.WE = tf.Variable(self.embeddings, trainable=self.embeddings_trainable, name='embeddings')
 
 
         # Initialze training stramers
+        # Load-only agents defer the trainer until fit is called
+        self._trainer = None
+        self._trainer_kwargs = {'fetch_factor': fetch_factor,
+                                'num_shards': num_shards,
+                                'shard_index': shard_index,
+                                'bucket_boundaries': bucket_boundaries,
+                                # XLA compiles one graph per time length
+                                'pad_to_boundary': xla}
+        if not self._restore_session or kwargs.get('build_trainer', True):
+            self.trainer
+
         # In order to re-train we force reuse=False
         with tf.variable_scope('pipeline_fit', reuse=False):
-            _, ds_list = get_binary(
-                'train', embeddings_model, lang=lang, version=version)
-            lb, ub = get_db_bounds('train', lang=lang)
-            chunk_size = min(ub - lb, batch_size)
-
-            self.trainer = TfStreamerWE(
-                self.WE, ds_list, chunk_size, epochs,
-                input_labels, target_labels, shuffle=True
-            )
-
             _, ds_list = get_binary(
                 'valid', embeddings_model, lang=lang, version=version)
             lb, ub = get_db_bounds('valid', lang=lang)
@@ -284,16 +355,25 @@ class SRLAgent(metaclass=AgentMeta):
 
 
         # The Labeler instanciation will build the archtecture
-        targets_size = [cnf_dict[lbl]['dims'] for lbl in target_labels]
         kwargs = {'learning_rate': lr, 'hidden_size': hidden_layers,
                   'targets_size': targets_size, 'rec_unit': rec_unit,
-                  'stack': stack}
+                  'stack': stack, 'mixed_precision': mixed_precision}
 
-        if self.single_task:
-            self.rnn = Labeler(self.X, self.T, self.L, **kwargs)
+        # Forward and backward passes are a single XLA cluster
+        # placed on the GPU -- soft placement falls back to the CPU
+        with tf.device('/gpu:0'), ExitStack() as scopes:
+            if xla:
+                scopes.enter_context(jit_scope())
 
-        if self.dual_task:
-            self.rnn = DualLabeler(self.X, self.T, self.L, recon_depth=recon_depth, **kwargs)
+            if self.single_task:
+                self.rnn = Labeler(self.X, self.T, self.L, **kwargs)
+
+            if self.dual_task:
+                self.rnn = DualLabeler(self.X, self.T, self.L, recon_depth=recon_depth, **kwargs)
+
+        # Only the last target is fetched for evaluation -- the R decode
+        # still runs on training steps as DualLabeler.error consumes it
+        self.Yhat = self.rnn.predict[-1] if self.dual_task else self.rnn.predict
 
         self.init_op = tf.group(
             tf.global_variables_initializer(),
@@ -319,10 +399,35 @@ class SRLAgent(metaclass=AgentMeta):
 
         # prevent from creating a new directory
         attr_dict['ckpt_dir'] = ckpt_dir
+        # the training pipeline is only built if fit is called
+        attr_dict['build_trainer'] = False
         agent = cls(**attr_dict)
 
         return agent
 
+    @property
+    def trainer(self):
+        '''Returns the training streamer -- built on first access
+
+        Returns:
+            trainer {TfStreamerWE} -- Shuffled and repeated over epochs
+        '''
+        if self._trainer is None:
+            with self.handle.graph.as_default(), \
+                    tf.variable_scope('pipeline_fit', reuse=False):
+                _, ds_list = get_binary(
+                    'train', self.embeddings_model,
+                    lang=self.lang, version=self.version)
+                lb, ub = get_db_bounds('train', lang=self.lang)
+                chunk_size = min(ub - lb, self.batch_size)
+
+                self._trainer = TfStreamerWE(
+                    self.WE, ds_list, chunk_size, self.epochs,
+                    self.input_labels, self.target_labels, shuffle=True,
+                    **self._trainer_kwargs
+                )
+        return self._trainer
+
     @property
     def single_task(self):
         return len(self.target_labels) == 1
@@ -336,13 +441,13 @@ class SRLAgent(metaclass=AgentMeta):
         '''Returns a working tensorflow session
         '''
         if self._session is None:
-            self._session = tf.Session()
+            self._session = tf.Session(config=self.session_config)
 
             self._session.run(self.init_op)
 
             if self._session._closed or self._restore_session:
-                saver = tf.train.Saver()
                 session_path = '{:}model.ckpt'.format(self.target_dir)
+                saver = tf.train.Saver(var_list=_restore_var_list(session_path))
                 # tries to restore saved model
                 saver.restore(self._session, session_path)
 
@@ -353,6 +458,31 @@ class SRLAgent(metaclass=AgentMeta):
         '''Sets the value
         '''
         self._session = val
+        self._handles = {}
+
+    @property
+    def session_config(self):
+        '''Options for every new session
+
+        Soft placement lets ops without a GPU kernel fall back to the CPU
+
+        Returns:
+            config {tf.ConfigProto}
+        '''
+        config = tf.ConfigProto(allow_soft_placement=True)
+
+        # Grappler passes which fuse and fold the labeler's pointwise ops
+        rewrite_options = config.graph_options.rewrite_options
+        rewrite_options.remapping = rewriter_config_pb2.RewriterConfig.ON
+        rewrite_options.arithmetic_optimization = rewriter_config_pb2.RewriterConfig.ON
+        rewrite_options.layout_optimizer = rewriter_config_pb2.RewriterConfig.ON
+        rewrite_options.constant_folding = rewriter_config_pb2.RewriterConfig.AGGRESSIVE
+        rewrite_options.loop_optimization = rewriter_config_pb2.RewriterConfig.ON
+
+        if self.xla:
+            config.graph_options.optimizer_options.global_jit_level = \
+                tf.OptimizerOptions.ON_1
+        return config
 
     @property
     def persist(self):
@@ -369,9 +499,7 @@ class SRLAgent(metaclass=AgentMeta):
             https://stackoverflow.com/questions/42175609/using-multiple-input-pipelines-in-tensorflow
         '''
         sess = self.session
-
-        coord = tf.train.Coordinator()
-        threads = tf.train.start_queue_runners(sess=sess, coord=coord)
+        feed_dict = {self.handle: self._handle(self.trainer)}
 
         # Training control variables
         step = 1
@@ -379,57 +507,64 @@ class SRLAgent(metaclass=AgentMeta):
         total_error = 0.0
         props = 0
         eps = 100
+        # Batch decodes are merged into train_dict on evaluation only
+        train_batches = []
         train_dict = {}
         lb, ub = get_db_bounds('train', lang=self.lang)
+        # A replica only reads its shard of the training set
+        train_size = get_shard_size(
+            self.trainer.datasets_list, ub - lb,
+            num_shards=self.trainer.num_shards,
+            shard_index=self.trainer.shard_index)
         epochs = 0
         f1_train = None
+        # Decodes predictions while the next batch runs
+        decode_pool = ThreadPoolExecutor(max_workers=2)
         try:
             start = time.time()
             batch_start = time.time()
-            # while not (coord.should_stop() or eps < 1e-3):
-            while not coord.should_stop():
-
-                X_batch, T_batch, L_batch, I_batch = sess.run(self.trainer.stream)
+            # The trainer raises OutOfRangeError after `epochs`
+            while True:
 
-                props += X_batch.shape[0]
-
-                loss, _, Y_batch, error = sess.run(
-                    [self.rnn.cost, self.rnn.label, self.rnn.predict, self.rnn.error],
-                    feed_dict={self.X: X_batch, self.T: T_batch, self.L: L_batch}
+                loss, _, Y_batch, error, L_batch, I_batch = sess.run(
+                    [self.rnn.cost, self.rnn.label, self.Yhat,
+                     self.rnn.error, self.L, self.I],
+                    feed_dict=feed_dict
                 )
 
-                # Batch dict stores info from batch decodes
-                if self.dual_task:
-                    R_batch, Y_batch = Y_batch
-
-                batch_dict = self.evaluator.decoder_fn(Y_batch, I_batch, L_batch, self.target_labels[-1:])
+                props += L_batch.shape[0]
 
-                train_dict.update(batch_dict)
+                # Batch dict stores info from batch decodes
+                train_batches.append(decode_pool.submit(
+                    self.evaluator.decoder_fn,
+                    Y_batch, I_batch, L_batch, self.target_labels[-1:]
+                ))
 
                 total_loss += loss
                 total_error += error
 
                 if (step) % 1000 == 0:
+                    train_dict = _merge_batches(train_dict, train_batches)
+                    train_batches = []
 
                     f1_train = self._evaluate_propositions(train_dict, 'train')
 
 
                     batch_end = time.time()
-                    print('Iter={:5d}'.format(step),
-                          '\tepochs {:5d}'.format(epochs),
-                          '\tavg. cost {:.6f}'.format(total_loss / 1000 ),
-                          '\tavg. error {:.6f}'.format(total_error / 1000 ),
-                          '\tavg. batch time {:.3f} s'.format((batch_end - batch_start) / 1000 ),
-                          '\tf1-train {:.6f}'.format(f1_train))
+                    logger.info(
+                        'Iter=%5d\tepochs %5d\tavg. cost %.6f\tavg. error %.6f'
+                        '\tavg. batch time %.3f s\tf1-train %.6f',
+                        step, epochs, total_loss / 1000, total_error / 1000,
+                        (batch_end - batch_start) / 1000, f1_train)
 
                     eps = float(total_error) / 1000
                     total_loss = 0.0
                     total_error = 0.0
                     batch_start = batch_end
 
-                if epochs < int(props / (ub - lb)):
+                if epochs < int(props / train_size):
 
-                    epochs = int(props / (ub - lb))
+                    epochs = int(props / train_size)
                     end_epoch = time.time()
 
                     f1_valid = next(self._evaluate_dataset('valid', self.validator))
@@ -446,23 +581,25 @@ class SRLAgent(metaclass=AgentMeta):
 
                         self.persist
 
-                    f1_train = self._evaluate_propositions(train_dict, 'train') if f1_train is None else f1_train
-                    print('Iter={:5d}'.format(step),
-                          '\tepochs {:5d}'.format(epochs),
-                          '\tepoch time {:3f} s'.format((end_epoch - start) / epochs),
-                          '\tf1-train {:.6f}'.format(f1_train),
-                          '\tf1-valid {:.6f}'.format(f1_valid))
-
+                    if f1_train is None:
+                        train_dict = _merge_batches(train_dict, train_batches)
+                        f1_train = self._evaluate_propositions(train_dict, 'train')
+                    logger.info(
+                        'Iter=%5d\tepochs %5d\tepoch time %3f s'
+                        '\tf1-train %.6f\tf1-valid %.6f',
+                        step, epochs, (end_epoch - start) / epochs,
+                        f1_train, f1_valid)
+
+                    _discard_batches(train_batches)
+                    train_batches = []
                     train_dict = {}
                 step += 1
 
         except tf.errors.OutOfRangeError:
-            print('Done training -- epoch limit reached')
-
+            _discard_batches(train_batches)
+            logger.info('Done training -- epoch limit reached')
         finally:
-            # When done, ask threads to stop
-            coord.request_stop()
-            coord.join(threads)
+            decode_pool.shutdown()
 
     def evaluate_trainset(self):
         rev = next(self._evaluate_dataset('train', self.trainer1))
@@ -482,47 +619,70 @@ class SRLAgent(metaclass=AgentMeta):
 
     def _evaluate_dataset(self, ds_type, streamer):
         sess = self.session
-
-        coord = tf.train.Coordinator()
-        threads = tf.train.start_queue_runners(sess=sess, coord=coord)
+        feed_dict = {self.handle: self._handle(streamer)}
 
         lb, ub = get_db_bounds(ds_type, lang=self.lang)
         prev_epochs = -1
         best_rate = 0
         epochs = 0
+        db_batches = []
         db_dict = {}
         props = 0
-
+        # Decodes predictions while the next batch runs
+        decode_pool = ThreadPoolExecutor(max_workers=2)
         try:
-            while not coord.should_stop():
-                Xchunk, Tchunk, Lchunk, Ichunk = sess.run(streamer.stream)
-
-                Ychunk = sess.run(self.rnn.predict, feed_dict={self.X: Xchunk, self.L:Lchunk})
-                if self.dual_task:
-                    Rchunk, Ychunk = Ychunk
-
-                db_dict.update(
-                    self.evaluator.decoder_fn(Ychunk, Ichunk, Lchunk, self.target_labels[-1:])
-                )
-                props += Xchunk.shape[0]
+            while True:
+                try:
+                    Ychunk, Lchunk, Ichunk = sess.run(
+                        [self.Yhat, self.L, self.I],
+                        feed_dict=feed_dict
+                    )
+                except tf.errors.OutOfRangeError:
+                    break
+
+                db_batches.append(decode_pool.submit(
+                    self.evaluator.decoder_fn,
+                    Ychunk, Ichunk, Lchunk, self.target_labels[-1:]
+                ))
+                props += Lchunk.shape[0]
                 #TODO: correct props to fit exactly on ub - lb
                 if epochs < int(props / (ub - lb)):
                     epochs = props / (ub - lb)
+                    db_dict = _merge_batches(db_dict, db_batches)
+                    db_batches = []
                     f1 = self._evaluate_propositions(db_dict, ds_type)
                     if best_rate < f1:
                         best_rate = f1
 
                     yield f1
 
-        except tf.errors.OutOfRangeError:
-            pass
-
+            _discard_batches(db_batches)
         finally:
-            # When done, ask threads to stop
-            coord.request_stop()
-            coord.join(threads)
+            # Also runs when the caller drops the generator after next()
+            decode_pool.shutdown()
+
+        return best_rate
+
+    def _handle(self, streamer):
+        '''Returns the string handle which selects streamer as input
+
+        The streamer's iterator is initialized on first use
+        for every new session -- never per evaluation: re-initializing
+        would drop the in-memory cache, so the validator keeps reading
+        its repeated epochs from memory
+
+        Arguments:
+            streamer {TfStreamerWE} -- Input pipeline
+
+        Returns:
+            handle {bytes} -- Value to be fed into self.handle
+        '''
+        if streamer not in self._handles:
+            sess = self.session
+            sess.run(streamer.iterator.initializer)
+            self._handles[streamer] = sess.run(streamer.handle)
 
-            return best_rate
+        return self._handles[streamer]
 
     def _evaluate_propositions(self, props_dict, filename):
         '''Thin wrapper  for a chained call on predict and eval
@@ -577,6 +737,116 @@ class SRLAgent(metaclass=AgentMeta):
 
 
 
+def _restore_var_list(session_path):
+    '''Maps the checkpoint names to the graph's global variables
+
+    Variables missing from the checkpoint are looked up by their
+    LEGACY_VARIABLE_NAMES -- so older checkpoints still restore
+
+    Arguments:
+        session_path {str} -- Path to model.ckpt
+
+    Returns:
+        var_list {dict<str, tf.Variable>} -- Saver's var_list
+    '''
+    ckpt_names = {name for name, _ in tf.train.list_variables(session_path)}
+
+    var_list = {}
+    for var in tf.global_variables():
+        name = var.op.name
+        if name not in ckpt_names:
+            for pattern, legacy in LEGACY_VARIABLE_NAMES:
+                legacy_name = pattern.sub(legacy, name)
+                if legacy_name in ckpt_names:
+                    name = legacy_name
+                    break
+        var_list[name] = var
+    return var_list
+
+
+@lru_cache(maxsize=4)
+def _load_encoder(propbank_path):
+    '''Unpickles the PropbankEncoder once per process
+
+    Every agent built on the same binary -- e.g. kfold -- shares it
+
+    Arguments:
+        propbank_path {str} -- Path to the pickled PropbankEncoder
+
+    Returns:
+        propbank_encoder {PropbankEncoder}
+    '''
+    return PropbankEncoder.recover(propbank_path)
+
+
+@lru_cache(maxsize=4)
+def _get_config(embeddings_model, lang):
+    '''Reads the config once per embeddings_model and lang
+
+    Arguments:
+        embeddings_model {str} -- Abbrev. of embedding_model name and size
+        lang {str} -- 'pt' or 'en'
+
+    Returns:
+        cnf_dict {dict} -- Shared -- must not be modified
+    '''
+    return config.get_config(embeddings_model, lang=lang)
+
+
+@lru_cache(maxsize=None)
+def _get_shapes(input_labels, target_labels, embeddings_size,
+                embeddings_model, lang):
+    '''Memoizes get_xshape and get_tshape
+
+    Arguments:
+        input_labels {tuple<str>} -- Features to be considered
+        target_labels {tuple<str>} -- Targets
+        embeddings_size {int} -- Word embeddings dimension
+        embeddings_model {str} -- Abbrev. of embedding_model name and size
+        lang {str} -- 'pt' or 'en'
+
+    Returns:
+        X_shape {tuple} -- (None, None, FEATURE_SIZE)
+        T_shape {tuple} -- (None, None) or (None, None, 2)
+    '''
+    cnf_dict = _get_config(embeddings_model, lang)
+    # Immutable -- the cached shapes are shared between agents
+    return (tuple(get_xshape(input_labels, embeddings_size, cnf_dict)),
+            tuple(get_tshape(target_labels, cnf_dict)))
+
+
+def _merge_batches(props_dict, batches_list):
+    '''Merges the batch decodes into props_dict
+
+    Blocks until every pending decode is done
+
+    Arguments:
+        props_dict {dict} -- Decoded propositions keyed by token index
+        batches_list {list<concurrent.futures.Future>} -- Batch decodes
+            in arrival order
+
+    Returns:
+        props_dict {dict} -- Updated props_dict
+    '''
+    for batch_future in batches_list:
+        props_dict.update(batch_future.result())
+    return props_dict
+
+
+def _discard_batches(batches_list):
+    '''Drops the batch decodes which won't be merged
+
+    Pending decodes are cancelled -- the others are waited on
+    so that an error raised while decoding isn't swallowed
+
+    Arguments:
+        batches_list {list<concurrent.futures.Future>} -- Batch decodes
+    '''
+    for batch_future in batches_list:
+        if not batch_future.cancel():
+            batch_future.result()
+
+
 def get_xshape(input_labels, embeddings_size, cnf_dict):
     # axis 0 --> examples
     # axis 1 --> max time
@@ -603,17 +873,14 @@ def get_xshape(input_labels, embeddings_size, cnf_dict):
 def get_tshape(output_labels, cnf_dict):
     # axis 0 --> examples
     # axis 1 --> max time
+    # targets are class indices -- the one-hot axis is added on the graph
     base_shape = [None, None]
     k = len(output_labels)
     if k == 1:
-        # axis 2 --> target size
-        m = cnf_dict[output_labels[0]]['dims']
-        tshape = base_shape + [m]
+        tshape = base_shape
     elif k == 2:
-        # axis 2 --> max target size
-        # axis 3 --> number of targets
-        m = max([cnf_dict[lbl]['dims'] for lbl in output_labels])
-        tshape = base_shape + [m, k]
+        # axis 2 --> number of targets
+        tshape = base_shape + [k]
     else:
         err = 'len(target_labels) <= 2 got {:}'.format(k)
         raise ValueError(err)
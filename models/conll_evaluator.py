@@ -344,7 +344,7 @@ class ConllEvaluator(object):
             target_dir = self._get_dir(hparams)
         else:
             target_dir = self.target_dir
-        target_path = '{:}/{:}.conll'.format(target_dir, filename)
+        target_path = os.path.join(target_dir, '{:}.conll'.format(filename))
         with open(target_path, 'w+') as f:
             f.write(self.txt)
 
@@ -360,7 +360,6 @@ class ConllEvaluator(object):
 
         with open(target_path, 'r') as f:
             self.txt = f.read()
-        f.close()
 
         self._parse(self.txt)
 
@@ -436,29 +435,24 @@ class ConllEvaluator(object):
         else:
             target_dir = self.target_dir
 
-        target_path = '{:}/{:}-{:}.props'.format(
-            target_dir,
-            ds_type,
-            prediction_type
-        )
+        target_path = os.path.join(
+            target_dir, '{:}-{:}.props'.format(ds_type, prediction_type))
 
+        # Propositions are separated by an empty line
+        lines = []
         p_1 = min(script_dict['P'].values())
-        first = True
-        with open(target_path, mode='w+') as f:
-            for idx, p in script_dict['P'].items():
-                if not first:
-                    if p != p_1:
-                        f.write('\n')
-                else:
-                    first = False
+        for idx, p in script_dict['P'].items():
+            if lines and p != p_1:
+                lines.append('')
 
-                pred = script_dict['PRED'][idx]
-                arg = script_dict['ARG'][idx]
-                f.write('{:}\t{:}\n'.format(pred, arg))
-                p_1 = p
+            pred = script_dict['PRED'][idx]
+            arg = script_dict['ARG'][idx]
+            lines.append('{:}\t{:}'.format(pred, arg))
+            p_1 = p
 
+        with open(target_path, mode='w+') as f:
+            f.write('\n'.join(lines) + '\n')
 
-        f.close()
         return target_path
 
     def _make_hparam_string(self, learning_rate=1 * 1e-3,
@@ -471,20 +465,18 @@ class ConllEvaluator(object):
 
         '''
         # hidden size hparameter
-        hs = re.sub(r'\[|\]', '', str(hidden_size))
-        hs = re.sub(r', ', 'x', hs)
+        if not isinstance(hidden_size, (list, tuple)):
+            hidden_size = [hidden_size]
+        hs = 'x'.join(map(str, hidden_size))
 
-        hparam_args = (float(learning_rate), hs, int(ctx_p))
-        hparam_string = 'lr{:.2e}_hs{:}_ctx-p{:d}'
-        hparam_string = hparam_string.format(*hparam_args)
+        hparam_string = f'lr{learning_rate:.2e}_hs{hs}_ctx-p{int(ctx_p):d}'
         if embeddings_id:
-            hparam_string += '_{:}'.format(embeddings_id)
+            hparam_string += f'_{embeddings_id}'
         return hparam_string
 
     def _get_dir(self, hparams):
         hparam_string = self._make_hparam_string(**hparams)
         target_dir = '{:}{:}/'.format('./', hparam_string)
         # Octal for read / write permissions
-        if not os.path.isdir(target_dir):
-            os.mkdir(target_dir, 0o777)
+        os.makedirs(target_dir, 0o777, exist_ok=True)
         return target_dir
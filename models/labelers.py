@@ -13,6 +13,34 @@ from models.propagators import get_propagator
 
 from models.predictors import CRFPredictor
 
+def _get_optimizer(mixed_precision=False, **kwargs):
+    '''Adam optimizer -- optionally rewritten for mixed precision
+
+    The graph rewrite casts eligible ops to float16 while variables,
+    the CRF and the loss stay in float32 -- dynamic loss scaling
+    prevents gradients from underflowing
+
+    Keyword Arguments:
+        mixed_precision {bool} -- Enables the rewrite (default: {False})
+        **kwargs {dict} -- tf.train.AdamOptimizer arguments
+
+    Returns:
+        optimizer {tf.train.Optimizer}
+
+    Raises:
+        ValueError -- mixed_precision on tensorflow older than 1.14
+    '''
+    optimizer = tf.train.AdamOptimizer(**kwargs)
+    if mixed_precision:
+        try:  # tensorflow 1.14
+            rewrite = tf.train.experimental.enable_mixed_precision_graph_rewrite
+        except AttributeError:
+            msg = 'mixed_precision requires tensorflow >= 1.14 found {:}'
+            raise ValueError(msg.format(tf.__version__))
+        optimizer = rewrite(optimizer)
+    return optimizer
+
+
 class LabelerMeta(type):
     '''This is a metaclass -- enforces method definition
     on function body
@@ -42,7 +70,7 @@ class LabelerMeta(type):
 class Labeler(object, metaclass=LabelerMeta):
     def __init__(self, X, T, L,
                  learning_rate=5 * 1e-3, hidden_size=[32, 32], targets_size=[60],
-                 rec_unit='BasicLSTM', stack='DB'):
+                 rec_unit='BasicLSTM', stack='DB', mixed_precision=False):
         '''Sets the computation graph parameters
 
         Responsable for building computation graph
@@ -72,6 +100,9 @@ class Labeler(object, metaclass=LabelerMeta):
 
             targets_size {int} -- Parameter holding the layer sizes (default: {60})
 
+            mixed_precision {bool} -- Computes in float16 keeping float32
+                weights and loss scaling (default: {False})
+
         References:
             https://www.tensorflow.org/programmers_guide/graphs
         '''
@@ -82,10 +113,11 @@ class Labeler(object, metaclass=LabelerMeta):
         self.learning_rate = learning_rate
         self.hidden_size = hidden_size
         self.targets_size = targets_size
+        self.mixed_precision = mixed_precision
 
         propagator_cls = get_propagator(stack)
         self.propagator = propagator_cls(X, L, hidden_size, rec_unit=rec_unit)
-        self.predictor = CRFPredictor(self.propagator.propagate, T, L)
+        self.predictor = CRFPredictor(self.propagator.parts, T, L)
 
         self.propagate
         self.cost
@@ -128,7 +160,8 @@ class Labeler(object, metaclass=LabelerMeta):
         '''
         with tf.variable_scope('label'):
             kwargs = {'learning_rate': self.learning_rate}
-            opt = tf.train.AdamOptimizer(**kwargs).minimize(self.cost)
+            opt = _get_optimizer(self.mixed_precision, **kwargs)
+            opt = opt.minimize(self.cost)
         return opt
 
 
@@ -144,10 +177,11 @@ class Labeler(object, metaclass=LabelerMeta):
         Returns:
             error {float} -- percentage of wrong tokens
         '''
-        mistakes = tf.not_equal(self.predict, tf.cast(tf.argmax(self.T, 2), tf.int32))
+        Tflat = self.predictor.Tflat
+        mistakes = tf.not_equal(self.predict, Tflat)
         mistakes = tf.cast(mistakes, tf.float32)
-        mask = tf.sign(tf.reduce_max(tf.abs(self.T), reduction_indices=2))
-        mask = tf.cast(mask, tf.float32)
+        # Paddings are the time steps beyond each proposition's length
+        mask = tf.sequence_mask(self.L, maxlen=tf.shape(Tflat)[1], dtype=tf.float32)
         mistakes *= mask
 
         # Average over actual sequence lengths.
@@ -160,7 +194,7 @@ class DualLabeler(object, metaclass=LabelerMeta):
 
     def __init__(self, X, T, L, recon_depth=-1,
                  learning_rate=5 * 1e-3, hidden_size=[32, 32], targets_size=[60],
-                 rec_unit='BasicLSTM'):
+                 rec_unit='BasicLSTM', mixed_precision=False):
         '''Sets the computation graph parameters
 
         Responsable for building computation graph -- expects R and Y to be 
@@ -282,6 +316,8 @@ class DualLabeler(object, metaclass=LabelerMeta):
             learning_rate {float} -- Parameter to be used during optimization (default: {5 * 1e-3})
             hidden_size {list<int>} --  Parameter holding the layer sizes (default: {`[32, 32]`})
             targets_size {int} -- Parameter holding the layer sizes (default: {60})
+            mixed_precision {bool} -- Computes in float16 keeping float32
+                weights and loss scaling (default: {False})
 
         References:
             https://www.tensorflow.org/programmers_guide/graphs
@@ -307,6 +343,7 @@ class DualLabeler(object, metaclass=LabelerMeta):
         self.learning_rate = learning_rate
         self.hidden_size = hidden_size
         self.targets_size = targets_size
+        self.mixed_precision = mixed_precision
 
         self.propagators = []
         self.predictors = []
@@ -315,10 +352,10 @@ class DualLabeler(object, metaclass=LabelerMeta):
                 InterleavedPropagator(X, L, hidden_size, rec_unit=rec_unit, scope_label='center')
             )
             self.predictors.append(
-                CRFPredictor(self.propagators[-1].propagate, self.R, L, scope_label='R')
+                CRFPredictor(self.propagators[-1].parts, self.R, L, scope_label='R')
             )
             self.predictors.append(
-                CRFPredictor(self.propagators[-1].propagate, self.Y, L, scope_label='Y')
+                CRFPredictor(self.propagators[-1].parts, self.Y, L, scope_label='Y')
             )
         elif recon_depth == 1 and len(hidden_size) == 1: # TYPE B
 
@@ -344,7 +381,7 @@ class DualLabeler(object, metaclass=LabelerMeta):
                 InterleavedPropagator(self.concat_op, L, hidden_size[:recon_depth], rec_unit=rec_unit, scope_label='center')
             )
             self.predictors.append(
-                CRFPredictor(self.propagators[-1].propagate, self.Y, L, scope_label='Y')
+                CRFPredictor(self.propagators[-1].parts, self.Y, L, scope_label='Y')
             )
 
         elif recon_depth >= 2 and recon_depth == len(hidden_size): # TYPE D
@@ -355,7 +392,7 @@ class DualLabeler(object, metaclass=LabelerMeta):
                 InterleavedPropagator(X, L, hidden_size[:recon_depth-1], rec_unit=rec_unit, scope_label='up')
             )
             self.predictors.append(
-                CRFPredictor(self.propagators[-1].propagate, self.R, L, scope_label='R')
+                CRFPredictor(self.propagators[-1].parts, self.R, L, scope_label='R')
             )
             self.predictors.append(
                 CRFPredictor(self.concat_op, self.Y, L, scope_label='Y')
@@ -368,13 +405,13 @@ class DualLabeler(object, metaclass=LabelerMeta):
                 InterleavedPropagator(X, L, hidden_size[:recon_depth-1], rec_unit=rec_unit, scope_label='up')
             )
             self.predictors.append(
-                CRFPredictor(self.propagators[-1].propagate, self.R, L, scope_label='R')
+                CRFPredictor(self.propagators[-1].parts, self.R, L, scope_label='R')
             )
             self.propagators.append(
                 InterleavedPropagator(self.concat_op, L, hidden_size[recon_depth:], rec_unit=rec_unit, scope_label='center')
             )
             self.predictors.append(
-                CRFPredictor(self.propagators[-1].propagate, self.Y, L, scope_label='Y')
+                CRFPredictor(self.propagators[-1].parts, self.Y, L, scope_label='Y')
             )
 
 
@@ -423,33 +460,39 @@ class DualLabeler(object, metaclass=LabelerMeta):
         '''
         with tf.variable_scope('label'):
             kwargs = {'learning_rate': self.learning_rate}
-            optimum = tf.train.AdamOptimizer(**kwargs).minimize(self.cost)
+            optimum = _get_optimizer(self.mixed_precision, **kwargs)
+            optimum = optimum.minimize(self.cost)
         return optimum
 
     @lazy_property
     def error(self):
         Rh, Yh = self.predict
-        mr, nr = self._abserror(Rh, self.R)
-        my, ny = self._abserror(Yh, self.Y)
+        Rflat = self.predictors[0].Tflat
+        Yflat = self.predictors[-1].Tflat
+        # Paddings are the time steps beyond each proposition's length
+        mask = tf.sequence_mask(self.L, maxlen=tf.shape(Yflat)[1], dtype=tf.float32)
+        mr, nr = self._abserror(Rh, Rflat, mask)
+        my, ny = self._abserror(Yh, Yflat, mask)
 
         errors = (mr + my) / (nr + ny)
         return errors
 
-    def _abserror(self, Y, T):
+    def _abserror(self, Y, Tflat, mask):
         '''Computes the prediction errors
 
         Compares target tags to predicted tags
 
-        Decorators:
-            lazy_property
+        Arguments:
+            Y {tensor} -- [batch, max_time] predicted tags
+            Tflat {tensor} -- [batch, max_time] target tags
+            mask {tensor} -- [batch, max_time] 1.0 on valid time steps
 
         Returns:
-            error {float} -- percentage of wrong tokens
+            mistakes {float} -- number of wrong tokens
+            tokens {float} -- number of tokens
         '''
-        mistakes = tf.not_equal(Y, tf.cast(tf.argmax(T, 2), tf.int32))
+        mistakes = tf.not_equal(Y, Tflat)
         mistakes = tf.cast(mistakes, tf.float32)
-        mask = tf.sign(tf.reduce_max(tf.abs(T), reduction_indices=2))
-        mask = tf.cast(mask, tf.float32)
         mistakes *= mask
 
         return tf.reduce_sum(mistakes), tf.reduce_sum(mask)
@@ -15,6 +15,34 @@ except ImportError:
 from models.lib.properties import lazy_property
 
 
+def project(parts, Wo):
+    '''Projects every (batch, time) step of the features onto Wo
+
+    Runs a single matmul per part instead of concatenating them
+    -- concat(parts) * Wo == sum(part * Wo[rows])
+
+    Arguments:
+        parts {tuple<tf.Tensor>} -- BATCH X MAX_TIME X PART_SIZE features
+        Wo {tf.Tensor} -- SUM(PART_SIZE) X TARGET_SIZE weights
+
+    Returns:
+        Sflat {tf.Tensor} -- BATCH * MAX_TIME X TARGET_SIZE scores
+    '''
+    if len(parts) == 1:
+        sz = int(parts[0].get_shape()[-1])
+        return tf.matmul(tf.reshape(parts[0], (-1, sz)), Wo)
+
+    Sflat = None
+    start = 0
+    for part in parts:
+        sz = int(part.get_shape()[-1])
+        Vflat = tf.reshape(part, (-1, sz))
+        S = tf.matmul(Vflat, Wo[start:start + sz])
+        Sflat = S if Sflat is None else Sflat + S
+        start += sz
+    return Sflat
+
+
 class PredictorMeta(type):
     '''This is a metaclass -- enforces method definition
     on function body
@@ -42,8 +70,9 @@ class CRFPredictor(object, metaclass=PredictorMeta):
         '''Builds a recurrent neural network section of the graph
 
         Arguments:
-            V {tensor} -- Rank 3 input tensor having dimensions as follows
-                        [batches, max_time, features]
+            V {tensor|tuple<tensor>} -- Rank 3 input tensor having dimensions as follows
+                        [batches, max_time, features] or a tuple of them
+                        to be regarded as concatenated over features
 
             T {tf.placeholder}  -- Rank 3 float tensor in which the dimensions are
                 * batch_size -- fixed sample size from examples
@@ -68,7 +97,7 @@ class CRFPredictor(object, metaclass=PredictorMeta):
         self.T = T
         self.L = L
         self.scope_label = scope_label
-        self.Tflat = tf.cast(tf.argmax(T, 2), tf.int32)
+        self.Tflat = tf.argmax(T, 2, output_type=tf.int32)
 
         with tf.variable_scope(scope_id):
             self.score
@@ -79,13 +108,15 @@ class CRFPredictor(object, metaclass=PredictorMeta):
     def score(self):
         scope_id = 'score{:}'.format(self.scope_label)
         with tf.variable_scope(scope_id):
-            Wo = tf.Variable(tf.random_normal(self.wo_shape, name='Wo'))
-            bo = tf.Variable(tf.random_normal(self.bo_shape, name='bo'))
+            Wo = tf.get_variable('Wo', shape=self.wo_shape,
+                                 initializer=tf.glorot_uniform_initializer())
+            bo = tf.get_variable('bo', shape=self.bo_shape,
+                                 initializer=tf.zeros_initializer())
 
-            # Stacking is cleaner and faster - but it's hard to use for multiple pipelines
-            self.S = tf.scan(
-                lambda a, x: tf.matmul(x, Wo),
-                self.V, initializer=tf.matmul(self.V[0], Wo)) + bo
+            _, t = self.wo_shape
+            shape = tf.shape(self.parts[0])
+            Sflat = project(self.parts, Wo) + bo
+            self.S = tf.reshape(Sflat, (shape[0], shape[1], t))
 
         return self.S
 
@@ -130,10 +161,16 @@ class CRFPredictor(object, metaclass=PredictorMeta):
 
         return tf.cast(viterbi_sequence, tf.int32)
 
+    @lazy_property
+    def parts(self):
+        if isinstance(self.V, (tuple, list)):
+            return tuple(self.V)
+        return (self.V,)
+
     @lazy_property
     def wo_shape(self):
         # Static dimensions are of class Dimension(n)
-        v = int(self.V.get_shape()[-1])
+        v = sum(int(part.get_shape()[-1]) for part in self.parts)
         t = int(self.T.get_shape()[-1])
         return (v, t)
 
@@ -8,7 +8,7 @@ import tensorflow as tf
 from models.lib.properties import lazy_property
 
 def get_unit(sz, rec_unit='BasicLSTM'):
-    ru_types = ('BasicLSTM', 'GRU', 'LSTM', 'LSTMBlockCell')
+    ru_types = ('BasicLSTM', 'GRU', 'LSTM', 'LSTMBlockCell', 'LSTMBlockFused')
     if rec_unit not in ru_types:
         raise ValueError('recurrent_unit {:} must be in {:}'.format (rec_unit, ru_types))
 
@@ -25,14 +25,56 @@ def get_unit(sz, rec_unit='BasicLSTM'):
                                            forget_bias=1.0,
                                            state_is_tuple=True)
 
-    # Should run faster then BasicLSTM and LSTM
+    # Should run faster then BasicLSTM and LSTM -- one kernel per step
+    # with a single matmul over [inputs, h]
     if rec_unit == 'LSTMBlockCell':
-        rnn_cell = tf.nn.rnn_cell.LSTMBlockCell(sz,
-                                           use_peepholes=True,
-                                           forget_bias=1.0,
-                                           state_is_tuple=True)
+        rnn_cell = tf.contrib.rnn.LSTMBlockCell(sz,
+                                                forget_bias=1.0,
+                                                use_peephole=True)
+
+    # Fused over the time axis -- one kernel per layer
+    if rec_unit == 'LSTMBlockFused':
+        rnn_cell = tf.contrib.rnn.LSTMBlockFusedCell(sz, forget_bias=1.0)
     return rnn_cell
 
+
+def run_unit(rnn_cell, inputs, sequence_length):
+    '''Runs rnn_cell over batch major inputs
+
+    LSTMBlockFusedCell is not an RNNCell -- it runs the whole
+    sequence itself and is time major
+
+    Arguments:
+        rnn_cell {tf.nn.rnn_cell.RNNCell|tf.contrib.rnn.LSTMBlockFusedCell}
+        inputs {tensor} -- [batches, max_time, features]
+        sequence_length {tensor} -- Rank 1 true length of each example
+
+    Returns:
+        outputs {tensor} -- [batches, max_time, units]
+    '''
+    if isinstance(rnn_cell, tf.contrib.rnn.LSTMBlockFusedCell):
+        outputs, _ = rnn_cell(
+            tf.transpose(inputs, [1, 0, 2]),
+            sequence_length=sequence_length,
+            dtype=tf.float32
+        )
+        return tf.transpose(outputs, [1, 0, 2])
+
+    outputs, _ = tf.nn.dynamic_rnn(
+        cell=rnn_cell,
+        inputs=inputs,
+        sequence_length=sequence_length,
+        dtype=tf.float32,
+        time_major=False
+    )
+    return outputs
+
+
+def _gpu_available():
+    '''True if tensorflow sees a CUDA device'''
+    return tf.test.is_gpu_available(cuda_only=True)
+
+
 def get_propagator(stack='DB'):
     if stack == 'DB':
         return InterleavedPropagator
@@ -167,19 +209,16 @@ class InterleavedPropagator(BasePropagator, metaclass=PropagatorMeta):
                 * max_time -- maximum time from batch_size examples (default: None)
                 * target_sz_list -- ouputs dimension
         '''
+        # One cell per layer and direction -- scopes are fw<i> and bw<i>
+        self.cells_fw = []
+        self.cells_bw = []
         with tf.variable_scope('fw0'):
-            self.cell_fw = get_unit(self.hidden_layers[0], self.rec_unit)
+            self.cells_fw.append(get_unit(self.hidden_layers[0], self.rec_unit))
 
-            outputs_fw, states = tf.nn.dynamic_rnn(
-                cell=self.cell_fw,
-                inputs=self.V,
-                sequence_length=self.L,
-                dtype=tf.float32,
-                time_major=False
-            )
+            outputs_fw = run_unit(self.cells_fw[-1], self.V, self.L)
 
         with tf.variable_scope('bw0'):
-            self.cell_bw = get_unit(self.hidden_layers[0], self.rec_unit)
+            self.cells_bw.append(get_unit(self.hidden_layers[0], self.rec_unit))
 
             inputs_bw = tf.reverse_sequence(
                 outputs_fw,
@@ -188,15 +227,10 @@ class InterleavedPropagator(BasePropagator, metaclass=PropagatorMeta):
                 seq_axis=1
             )
 
-            outputs_bw, states = tf.nn.dynamic_rnn(
-                cell=self.cell_bw,
-                inputs=inputs_bw,
-                sequence_length=self.L,
-                dtype=tf.float32,
-                time_major=False
-            )
+            # Backward outputs are kept in reversed time as well
+            outputs_rbw = run_unit(self.cells_bw[-1], inputs_bw, self.L)
             outputs_bw = tf.reverse_sequence(
-                outputs_bw,
+                outputs_rbw,
                 self.L,
                 batch_axis=0,
                 seq_axis=1
@@ -204,38 +238,30 @@ class InterleavedPropagator(BasePropagator, metaclass=PropagatorMeta):
 
         h = outputs_bw
         h_1 = outputs_fw
+        rh = outputs_rbw
         for i, sz in enumerate(self.hidden_layers[1:]):
 
             with tf.variable_scope('fw{:}'.format(i + 1)):
                 inputs_fw = tf.concat((h, h_1), axis=2)
-                self.cell_fw = get_unit(sz, self.rec_unit)
+                self.cells_fw.append(get_unit(sz, self.rec_unit))
 
-                outputs_fw, states = tf.nn.dynamic_rnn(
-                    cell=self.cell_fw,
-                    inputs=inputs_fw,
-                    sequence_length=self.L,
-                    dtype=tf.float32,
-                    time_major=False)
+                outputs_fw = run_unit(self.cells_fw[-1], inputs_fw, self.L)
 
             with tf.variable_scope('bw{:}'.format(i + 1)):
-                inputs_bw = tf.concat((outputs_fw, h), axis=2)
-                inputs_bw = tf.reverse_sequence(
-                    inputs_bw,
+                # reverse(concat(fw, h)) == concat(reverse(fw), rh)
+                inputs_rfw = tf.reverse_sequence(
+                    outputs_fw,
                     self.L,
                     batch_axis=0,
                     seq_axis=1
                 )
-                self.cell_bw = get_unit(sz, self.rec_unit)
+                inputs_bw = tf.concat((inputs_rfw, rh), axis=2)
+                self.cells_bw.append(get_unit(sz, self.rec_unit))
 
-                outputs_bw, states = tf.nn.dynamic_rnn(
-                    cell=self.cell_bw,
-                    inputs=inputs_bw,
-                    sequence_length=self.L,
-                    dtype=tf.float32,
-                    time_major=False)
+                outputs_rbw = run_unit(self.cells_bw[-1], inputs_bw, self.L)
 
                 outputs_bw = tf.reverse_sequence(
-                    outputs_bw,
+                    outputs_rbw,
                     self.L,
                     batch_axis=0,
                     seq_axis=1
@@ -243,10 +269,13 @@ class InterleavedPropagator(BasePropagator, metaclass=PropagatorMeta):
 
             h = outputs_bw
             h_1 = outputs_fw
+            rh = outputs_rbw
 
         # self.V = tf.concat((h, h_1), axis=2)
 
         # return self.V
+        # Consumers may project each part instead of the concatenation
+        self.parts = (h, h_1)
         return tf.concat((h, h_1), axis=2)
 
 class BiPropagator(BasePropagator, metaclass=PropagatorMeta):
@@ -272,17 +301,114 @@ class BiPropagator(BasePropagator, metaclass=PropagatorMeta):
                 * target_sz_list -- ouputs dimension
         '''
 
+        if self.rec_unit == 'CudnnLSTM':
+            if len(set(self.hidden_layers)) > 1:
+                err = 'CudnnLSTM requires equal hidden_layers got {:}'
+                raise ValueError(err.format(self.hidden_layers))
+
+            if _gpu_available():
+                return self._propagate_cudnn()
+            return self._propagate_cudnn_compatible()
+
+        return self._propagate_cells(self.rec_unit)
+
+    def _propagate_cudnn(self):
+        '''Runs the whole bidirectional stack as a single cuDNN kernel
+
+        cuDNN concatenates fw and bw outputs between layers as this stack
+
+        Returns:
+            outputs {tensor} -- [batches, max_time, 2 * hidden_layers[-1]]
+        '''
+        lstm = tf.contrib.cudnn_rnn.CudnnLSTM(
+            len(self.hidden_layers), self.hidden_layers[0],
+            direction='bidirectional', dtype=tf.float32, name='cudnn_lstm')
+
+        outputs, _ = lstm(
+            tf.transpose(self.V, [1, 0, 2]),
+            sequence_lengths=self.L
+        )
+        outputs = tf.transpose(outputs, [1, 0, 2])
+        self.parts = (outputs,)
+        return outputs
+
+    def _propagate_cudnn_compatible(self):
+        '''Runs the cuDNN stack on hosts without a GPU
+
+        CudnnLSTM saves its weights in the canonical layout of
+        CudnnCompatibleLSTMCell under cudnn_lstm/stack_bidirectional_rnn
+        -- so checkpoints restore on either path
+
+        Returns:
+            outputs {tensor} -- [batches, max_time, 2 * hidden_layers[-1]]
+        '''
+        cell = tf.contrib.cudnn_rnn.CudnnCompatibleLSTMCell
+        self.cells_fw = [cell(h) for h in self.hidden_layers]
+        self.cells_bw = [cell(h) for h in self.hidden_layers]
+        with tf.variable_scope('cudnn_lstm'):
+            outputs, _, _ = tf.contrib.rnn.stack_bidirectional_dynamic_rnn(
+                self.cells_fw, self.cells_bw, self.V,
+                sequence_length=self.L,
+                dtype=tf.float32,
+                time_major=False
+            )
+
+        self.parts = (outputs,)
+        return outputs
+
+    def _propagate_cells(self, rec_unit):
+        '''Stacks one bidirectional layer of rec_unit per hidden layer
+
+        Arguments:
+            rec_unit {str} -- Name of the recurrent unit
+
+        Returns:
+            outputs {tensor} -- [batches, max_time, 2 * hidden_layers[-1]]
+        '''
+        if rec_unit == 'LSTMBlockFused':
+            return self._propagate_fused()
+
+        self.cells_fw = [get_unit(h, rec_unit=rec_unit) for h in self.hidden_layers]
+        self.cells_bw = [get_unit(h, rec_unit=rec_unit) for h in self.hidden_layers]
+        outputs, _, _ = tf.contrib.rnn.stack_bidirectional_dynamic_rnn(
+            self.cells_fw, self.cells_bw, self.V,
+            sequence_length=self.L,
+            dtype=tf.float32,
+            time_major=False
+        )
+
+        self.parts = (outputs,)
+        return outputs
+
+    def _propagate_fused(self):
+        '''Stacks bidirectional layers of LSTMBlockFusedCell
+
+        LSTMBlockFusedCell is not an RNNCell -- the backward direction
+        runs over the reversed inputs
+
+        Returns:
+            outputs {tensor} -- [batches, max_time, 2 * hidden_layers[-1]]
+        '''
+        self.cells_fw = []
+        self.cells_bw = []
         inputs = self.V
         for i, h in enumerate(self.hidden_layers):
             with tf.variable_scope(f'h{i}'):
-                fw = get_unit(h, rec_unit=self.rec_unit)
-                bw = get_unit(h, rec_unit=self.rec_unit)
-                outputs, states = tf.nn.bidirectional_dynamic_rnn(
-                    fw, bw, inputs,
-                    sequence_length=self.L,
-                    dtype=tf.float32,
-                    time_major=False,
-                )
-                inputs = tf.concat(outputs, axis=2)
-
+                fw = get_unit(h, rec_unit='LSTMBlockFused')
+                bw = get_unit(h, rec_unit='LSTMBlockFused')
+                self.cells_fw.append(fw)
+                self.cells_bw.append(bw)
+                with tf.variable_scope('fw'):
+                    outputs_fw = run_unit(fw, inputs, self.L)
+
+                with tf.variable_scope('bw'):
+                    inputs_bw = tf.reverse_sequence(
+                        inputs, self.L, batch_axis=0, seq_axis=1)
+                    outputs_bw = tf.reverse_sequence(
+                        run_unit(bw, inputs_bw, self.L),
+                        self.L, batch_axis=0, seq_axis=1)
+                inputs = tf.concat((outputs_fw, outputs_bw), axis=2)
+
+        # Consumers may project each part instead of the concatenation
+        self.parts = (outputs_fw, outputs_bw)
         return inputs
@@ -9,7 +9,7 @@
 import tensorflow as tf
 
 from models.lib.properties import lazy_property
-from datasets import input_with_embeddings_fn, input_fn
+from datasets import dataset_with_embeddings_fn, input_fn
 from datasets.scripts.tfrecords2 import get_train, get_valid, get_test
 from datasets.scripts.tfrecords2 import get_train2, get_valid2, get_test2
 
@@ -101,7 +101,9 @@ class TfStreamerWE(object):
     '''
     def __init__(self, word_embeddings, datasets_list,
                  batch_size, epochs, input_labels, target_label,
-                 shuffle):
+                 shuffle, cache_path='', fetch_factor=8,
+                 num_shards=1, shard_index=0, bucket_boundaries=None,
+                 pad_to_boundary=False):
         self.we = word_embeddings
         self.datasets_list = datasets_list
         self.batch_size = batch_size
@@ -109,8 +111,14 @@ class TfStreamerWE(object):
         self.input_labels = input_labels
         self.target_label = target_label
         self.shuffle = shuffle
+        self.cache_path = cache_path
+        self.fetch_factor = fetch_factor
+        self.num_shards = num_shards
+        self.shard_index = shard_index
+        self.bucket_boundaries = bucket_boundaries
+        self.pad_to_boundary = pad_to_boundary
 
-        self.stream
+        self.iterator
 
     @classmethod
     def get_train(cls, word_embeddings, input_labels, target_label,
@@ -146,27 +154,53 @@ class TfStreamerWE(object):
         return inputs, targets, seqlens, descriptors
 
     @lazy_property
-    def stream(self):
-        '''Performs a 1-step read on datasets_list of size batch 250
+    def dataset(self):
+        '''Builds the input pipeline over datasets_list
 
-        Builds the pipeline scope -- which feeds the X, T, L, I tensors
+        Decorators:
+            lazy_property
+
+        Returns:
+            dataset {tf.data.Dataset} -- yields the X, T, L, I batches
+        '''
+        # Reading, parsing and batching stay on the host
+        with tf.device('/cpu:0'), tf.name_scope('pipeline'):
+            dataset = dataset_with_embeddings_fn(
+                self.we, self.datasets_list, self.batch_size,
+                self.epochs, self.input_labels, self.target_label,
+                shuffle=self.shuffle, cache_path=self.cache_path,
+                fetch_factor=self.fetch_factor,
+                num_shards=self.num_shards, shard_index=self.shard_index,
+                bucket_boundaries=self.bucket_boundaries,
+                pad_to_boundary=self.pad_to_boundary)
+
+        return dataset
+
+    @lazy_property
+    def iterator(self):
+        '''Initializable iterator over dataset
+
+        Must be initialized on every new session -- batches are prefetched
+        on the host: `prefetch_to_device` iterators provide no string handle
+        and the one-shot variant cannot capture the embeddings variable
 
         Decorators:
             lazy_property
 
         Returns:
-            inputs {tensor} -- features of size [BATCH_SIZE, MAX_TIME, FEATURES]
-            targets {tensor} -- targets of size [BATCH_SIZE, MAX_TIME, CLASSES]
-            seqlens {tensor} -- seqlens true TIME of the example rank 1 tensor
-            descriptors {tensor} -- index of the example on the database rank 1 tensor
+            iterator {tf.data.Iterator}
         '''
-        # with tf.name_scope('pipeline'):
-        #     self.WE = tf.Variable(self.we,
-        #                           trainable=self.trainable, name='embeddings')
+        with tf.device('/cpu:0'):
+            return self.dataset.make_initializable_iterator()
 
-        self.inputs, self.targets, self.seqlens, self.descriptors = input_with_embeddings_fn(
-            self.we, self.datasets_list, self.batch_size,
-            self.epochs, self.input_labels, self.target_label, shuffle=True)
+    @lazy_property
+    def handle(self):
+        '''String handle -- feeds a `tf.data.Iterator.from_string_handle`
 
-        return self.inputs, self.targets, self.seqlens, self.descriptors
+        Decorators:
+            lazy_property
 
+        Returns:
+            handle {tensor} -- scalar string tensor
+        '''
+        return self.iterator.string_handle()
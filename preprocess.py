@@ -104,8 +104,7 @@ def make_propbank_encoder(encoder_name='deep_glo50',
             # filename = column_path.split('/')[-1]
             # dirs = column_path.split('/')[:-1]
             dir_ = '/'.join(dirs)
-            if not os.path.isdir(dir_):
-                os.makedirs(dir_)
+            os.makedirs(dir_, exist_ok=True)
 
             column_dict = FEATURE_MAKER_DICT[filename]
             maker_fnc, msg = column_dict['marker_fnc'], column_dict['column']
@@ -133,8 +132,7 @@ def make_propbank_encoder(encoder_name='deep_glo50',
     model_alias = '{:}{:}'.format(get_model_alias(embs_model), embs_size)
 
     bin_dir, bin_path = get_binary('deep', model_alias, lang=lang, version=version)
-    if not os.path.isdir(bin_dir):
-        os.makedirs(bin_dir)
+    os.makedirs(bin_dir, exist_ok=True)
 
     propbank_encoder.persist(bin_dir, filename=encoder_name)
     return propbank_encoder
@@ -152,8 +150,7 @@ def make_tfrecords(encoder_name='deep_glo50', propbank_encoder=None,
     if version in ('1.0') or lang == 'en':
         bin_dir += '{:}/'.format(embs_model)
 
-    if not os.path.isdir(bin_dir):
-        os.makedirs(bin_dir)
+    os.makedirs(bin_dir, exist_ok=True)
 
     if propbank_encoder is None:
         bin_path = '{:}{:}.pickle'.format(bin_dir, encoder_name)
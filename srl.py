@@ -20,6 +20,12 @@
 '''
 
 import argparse
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+
 import config
 from models import estimate, estimate_kfold, estimate_recover
 from models import PropbankEncoder
@@ -38,41 +44,6 @@ if __name__ == '__main__':
             Uses CoNLL 2004 or 2005 Shared Task pearl evaluator
             under the hood.''')
 
-<<<<<<< HEAD
-    parser.add_argument('depth', type=int, nargs='+', default=[16] * 4,
-                        help='''Set of integers corresponding
-                        the deep layer sizes. default: 16 16 16 16\n''')
-
-    parser.add_argument('-embeddings', dest='embeddings', nargs=1,
-                        default='glo50', choices=['glo50', 'wan50', 'wrd50'],
-                        help='''Embedding abbrev.
-                        and size examples: glo50, wan50. Default: glo50 \n''')
-
-    parser.add_argument('-ctx_p', dest='ctx_p', type=int, nargs=1,
-                        default=1, choices=[1, 2, 3],
-                        help='''Size of sliding window around predicate.
-                                Default: 1\n''')
-
-    parser.add_argument('-lr', dest='lr', type=float, nargs=1,
-                        default=5 * 1e-3,
-                        help='''Learning rate of the model.
-                                Default: 0.005\n''')
-
-    parser.add_argument('-batch_size', dest='batch_size', type=int, nargs=1,
-                        default=250,
-                        help='''Batch size.
-                                Default: 250 \n''')
-
-    parser.add_argument('-epochs', dest='epochs', type=int, nargs=1,
-                        default=1000,
-                        help='''Number of times to repeat training set during training.
-                                Default: 1000\n''')
-
-    parser.add_argument('-target', dest='target', nargs=1,
-                        default='T', choices=['T', 'IOB', 'HEAD'],
-                        help='''Target representations.
-                                Default: `T`\n''')
-=======
     parser.add_argument('depth', type=int, nargs='*', default=[16] * 4,
                         help='''Set of integers corresponding
                         the deep layer sizes. default: 16 16 16 16\n''')
@@ -108,7 +79,6 @@ if __name__ == '__main__':
     parser.add_argument('--epochs', dest='epochs', type=int, default=1000,
                         help='''Number of times to repeat training set during training.
                                 Default: 1000\n''')
->>>>>>> development
 
     parser.add_argument('--kfold', action='store_true',
                         help='''if present performs kfold
@@ -125,8 +95,11 @@ if __name__ == '__main__':
                                 Default: 0.005\n''')
 
     parser.add_argument('--rec_unit', dest='rec_unit', type=str,
-                        default='BasicLSTM', choices=('BasicLSTM', 'GRU', 'LSTM'),
+                        default='BasicLSTM',
+                        choices=('BasicLSTM', 'GRU', 'LSTM', 'LSTMBlockCell',
+                                 'LSTMBlockFused', 'CudnnLSTM'),
                         help='''Recurrent unit -- according to tensorflow.
+                                `CudnnLSTM` requires `--stack BI`.
                                 Default: `BasicLSTM`\n''')
 
     parser.add_argument('--targets', dest='targets', default=['T'], nargs='+',
@@ -144,12 +117,32 @@ if __name__ == '__main__':
                         is inactive unless R is provided as a target.
                         Default: 1\n''')
 
+    parser.add_argument('--xla', action='store_true',
+                        help='''if present compiles the labeler with XLA.
+                                Default: False''')
+
+    parser.add_argument('--mixed_precision', action='store_true',
+                        help='''if present trains in float16 with
+                                float32 weights -- requires
+                                tensorflow >= 1.14. Default: False''')
+
     parser.add_argument('--version', type=str, dest='version',
                         choices=('1.0', '1.1',), default='1.0',
                         help='PropBankBr: version 1.0 or 1.1')
 
     args = parser.parse_args()
 
+    # Records are written by a background listener -- training
+    # never blocks on stdout
+    log_queue = queue.Queue()
+    log_listener = logging.handlers.QueueListener(
+        log_queue, logging.StreamHandler(sys.stdout))
+    logging.basicConfig(
+        level=logging.INFO, format='%(message)s',
+        handlers=[logging.handlers.QueueHandler(log_queue)])
+    log_listener.start()
+    atexit.register(log_listener.stop)
+
     ckpt_dir = args.ckpt_dir
 
     input_labels = config.FEATURE_LABELS
@@ -201,7 +194,8 @@ if __name__ == '__main__':
                 hidden_layers=args.depth, embeddings_model=embs_model,
                 epochs=epochs, rec_unit=rec_unit, batch_size=args.batch_size,
                 version=version, lr=learning_rate, recon_depth=recon_depth,
-                lang=lang, stack=stack)
+                lang=lang, stack=stack, xla=args.xla,
+                mixed_precision=args.mixed_precision)
 
         agent.fit()
 
@@ -5,7 +5,10 @@
     @author: Varela
 '''
 import unittest
+from unittest.mock import Mock
 import os, sys
+import shutil
+import tempfile
 sys.path.insert(0, os.getcwd())
 from collections import OrderedDict
 
@@ -182,4 +185,71 @@ class EvaluatorConllTensor(EvaluatorConllBaseCase):
                 self.prefix, npy_index, npy_predictions,
                 [width] * depth, ['IOB'], {})
 
-            self.assertEqual(self.evaluator.f1, 100.0)            
+            self.assertEqual(self.evaluator.f1, 100.0)
+
+
+class EvaluatorConllStore(unittest.TestCase):
+    '''_store must write the props files the CoNLL script expects'''
+
+    def setUp(self):
+        pe = Mock()
+        pe.to_config.return_value = {}
+        self.target_dir = tempfile.mkdtemp()
+        self.evaluator = ConllEvaluator(pe, target_dir=self.target_dir)
+
+        self.script_dict = OrderedDict({})
+        self.script_dict['P'] = OrderedDict([(0, 1), (1, 1), (2, 2), (3, 3)])
+        self.script_dict['PRED'] = OrderedDict(
+            [(0, 'ser'), (1, '-'), (2, 'ter'), (3, '-')])
+        self.script_dict['ARG'] = OrderedDict(
+            [(0, '(V*)'), (1, '(A1*)'), (2, '(V*)'), (3, '*')])
+
+    def tearDown(self):
+        shutil.rmtree(self.target_dir, ignore_errors=True)
+
+    def test_props(self):
+        target_path = self.evaluator._store(
+            'valid', 'gold', self.script_dict, {})
+
+        with open(target_path, mode='rb') as f:
+            props = f.read()
+
+        self.assertEqual(
+            props,
+            b'ser\t(V*)\n-\t(A1*)\n\nter\t(V*)\n\n-\t*\n')
+
+    def test_path(self):
+        target_path = self.evaluator._store(
+            'valid', 'gold', self.script_dict, {})
+
+        self.assertEqual(
+            target_path, os.path.join(self.target_dir, 'valid-gold.props'))
+
+
+class EvaluatorConllHparamString(unittest.TestCase):
+
+    def setUp(self):
+        pe = Mock()
+        pe.to_config.return_value = {}
+        self.evaluator = ConllEvaluator(pe)
+
+    def test_scalar_hidden_size(self):
+        hparam_string = self.evaluator._make_hparam_string(
+            learning_rate=1 * 1e-3, hidden_size=32, ctx_p=1)
+        self.assertEqual(hparam_string, 'lr1.00e-03_hs32_ctx-p1')
+
+    def test_list_hidden_size(self):
+        hparam_string = self.evaluator._make_hparam_string(
+            learning_rate=1 * 1e-3, hidden_size=[32, 32], ctx_p=1)
+        self.assertEqual(hparam_string, 'lr1.00e-03_hs32x32_ctx-p1')
+
+    def test_embeddings_id(self):
+        hparam_string = self.evaluator._make_hparam_string(
+            learning_rate=5 * 1e-3, hidden_size=[16] * 4, ctx_p=3,
+            embeddings_id='glo50')
+        self.assertEqual(hparam_string, 'lr5.00e-03_hs16x16x16x16_ctx-p3_glo50')
+
+    def test_float_ctx_p(self):
+        hparam_string = self.evaluator._make_hparam_string(
+            learning_rate=1 * 1e-3, hidden_size=[32, 32], ctx_p=2.0)
+        self.assertEqual(hparam_string, 'lr1.00e-03_hs32x32_ctx-p2')
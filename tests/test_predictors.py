@@ -0,0 +1,48 @@
+'''Tests models.predictors
+
+    Created on Oct 15, 2026
+
+'''
+import unittest
+import os, sys
+sys.path.insert(0, os.getcwd())
+
+import numpy as np
+import tensorflow as tf
+
+from models.predictors import project
+
+
+class ProjectTest(unittest.TestCase):
+    '''Projecting each part must match projecting their concatenation'''
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.parts = (
+            rng.randn(2, 5, 3).astype(np.float32),
+            rng.randn(2, 5, 4).astype(np.float32)
+        )
+        self.Wo = rng.randn(7, 6).astype(np.float32)
+
+        V = np.concatenate(self.parts, axis=2)
+        self.expected = np.dot(V.reshape(-1, 7), self.Wo)
+
+    def _run(self, parts, Wo):
+        with tf.Graph().as_default():
+            Sflat = project(tuple(tf.constant(p) for p in parts), tf.constant(Wo))
+            with tf.Session() as sess:
+                return sess.run(Sflat)
+
+    def test_parts(self):
+        Sflat = self._run(self.parts, self.Wo)
+        self.assertEqual(Sflat.shape, (10, 6))
+        np.testing.assert_allclose(Sflat, self.expected, rtol=1e-5, atol=1e-5)
+
+    def test_single_part(self):
+        V = np.concatenate(self.parts, axis=2)
+        Sflat = self._run((V,), self.Wo)
+        np.testing.assert_allclose(Sflat, self.expected, rtol=1e-5, atol=1e-5)
+
+
+if __name__ == '__main__':
+    unittest.main()
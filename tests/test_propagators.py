@@ -0,0 +1,80 @@
+'''Tests models.propagators
+
+    Created on Oct 15, 2026
+
+'''
+import unittest
+import os, sys
+sys.path.insert(0, os.getcwd())
+
+import numpy as np
+import tensorflow as tf
+
+from models.propagators import InterleavedPropagator
+
+
+def _reverse(inputs, L):
+    return tf.reverse_sequence(inputs, L, batch_axis=0, seq_axis=1)
+
+
+def _run(cell, inputs, L):
+    outputs, _ = tf.nn.dynamic_rnn(
+        cell, inputs, sequence_length=L, dtype=tf.float32)
+    return outputs
+
+
+def _interleaved(V, L, cells_fw, cells_bw):
+    '''The interleaved stack reversing concat(outputs_fw, h) on every layer'''
+    outputs_fw = _run(cells_fw[0], V, L)
+    outputs_bw = _reverse(_run(cells_bw[0], _reverse(outputs_fw, L), L), L)
+    h, h_1 = outputs_bw, outputs_fw
+    for cell_fw, cell_bw in zip(cells_fw[1:], cells_bw[1:]):
+        outputs_fw = _run(cell_fw, tf.concat((h, h_1), axis=2), L)
+        inputs_bw = _reverse(tf.concat((outputs_fw, h), axis=2), L)
+        outputs_bw = _reverse(_run(cell_bw, inputs_bw, L), L)
+        h, h_1 = outputs_bw, outputs_fw
+    return tf.concat((h, h_1), axis=2)
+
+
+class InterleavedPropagatorTest(unittest.TestCase):
+    '''Reversing only the new outputs matches reversing the whole input'''
+
+    def _run(self, hidden_layers, rec_unit='BasicLSTM'):
+        rng = np.random.RandomState(0)
+        # Paddings hold garbage -- only the true lengths must matter
+        V_batch = rng.randn(3, 6, 4).astype(np.float32)
+        L_batch = np.array([6, 4, 1], dtype=np.int32)
+        with tf.Graph().as_default():
+            tf.set_random_seed(0)
+            V = tf.placeholder(tf.float32, shape=(None, None, 4))
+            L = tf.placeholder(tf.int32, shape=(None,))
+            propagator = InterleavedPropagator(
+                V, L, hidden_layers, rec_unit=rec_unit, scope_label='T')
+
+            # Same cells -- hence the same weights
+            expected = _interleaved(
+                V, L, propagator.cells_fw, propagator.cells_bw)
+
+            with tf.Session() as sess:
+                sess.run(tf.global_variables_initializer())
+                return sess.run(
+                    (propagator.propagate, expected),
+                    feed_dict={V: V_batch, L: L_batch})
+
+    def test_equal_layers(self):
+        outputs, expected = self._run([4, 4, 4])
+        self.assertEqual(outputs.shape, (3, 6, 8))
+        np.testing.assert_allclose(outputs, expected, rtol=1e-5, atol=1e-5)
+
+    def test_growing_layers(self):
+        outputs, expected = self._run([3, 4, 5])
+        self.assertEqual(outputs.shape, (3, 6, 10))
+        np.testing.assert_allclose(outputs, expected, rtol=1e-5, atol=1e-5)
+
+    def test_gru(self):
+        outputs, expected = self._run([3, 5], rec_unit='GRU')
+        np.testing.assert_allclose(outputs, expected, rtol=1e-5, atol=1e-5)
+
+
+if __name__ == '__main__':
+    unittest.main()
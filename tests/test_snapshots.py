@@ -0,0 +1,83 @@
+'''Tests utils.snapshots
+
+    Created on Oct 15, 2026
+
+'''
+import unittest
+import os, sys
+import json
+import shutil
+import tempfile
+sys.path.insert(0, os.getcwd())
+
+from utils.snapshots import snapshot_persist, snapshot_recover, \
+    SNAPSHOT_KEYS, OPTIONAL_KEYS, KFOLD_KEYS, BATCH_KEYS, \
+    KFOLD_KEYS_SET, BATCH_KEYS_SET
+
+
+class SnapshotKeysTest(unittest.TestCase):
+
+    def test_kfold_keys(self):
+        self.assertEqual(KFOLD_KEYS, tuple(sorted(SNAPSHOT_KEYS - {'batch_size'})))
+        self.assertEqual(KFOLD_KEYS_SET, frozenset(KFOLD_KEYS))
+
+    def test_batch_keys(self):
+        self.assertEqual(BATCH_KEYS, tuple(sorted(SNAPSHOT_KEYS - {'kfold'})))
+        self.assertEqual(BATCH_KEYS_SET, frozenset(BATCH_KEYS))
+
+    def test_optional_keys_are_not_required(self):
+        self.assertFalse(OPTIONAL_KEYS & SNAPSHOT_KEYS)
+
+
+class SnapshotPersistTest(unittest.TestCase):
+    '''params.json holds the sorted keys of the training mode'''
+
+    def setUp(self):
+        self.target_dir = tempfile.mkdtemp() + '/'
+        # The agent always passes more than the persisted keys
+        self.params = {key: key for key in BATCH_KEYS}
+        self.params['ckpt_dir'] = None
+
+    def tearDown(self):
+        shutil.rmtree(self.target_dir, ignore_errors=True)
+
+    def _persist(self, **kwargs):
+        target_dir = snapshot_persist(self.target_dir, **kwargs)
+        with open('{:}params.json'.format(target_dir), mode='r') as f:
+            keys = list(json.load(f))
+        return target_dir, keys
+
+    def test_batch_keys(self):
+        _, keys = self._persist(**self.params)
+        self.assertEqual(keys, list(BATCH_KEYS))
+
+    def test_kfold_keys(self):
+        del self.params['batch_size']
+        self.params['kfold'] = 'kfold'
+        _, keys = self._persist(**self.params)
+        self.assertEqual(keys, list(KFOLD_KEYS))
+
+    def test_recover(self):
+        target_dir, _ = self._persist(**self.params)
+        params_dict = snapshot_recover(target_dir)
+        self.assertEqual(params_dict, {key: key for key in BATCH_KEYS})
+
+    def test_optional_keys(self):
+        self.params['xla'] = True
+        self.params['mixed_precision'] = False
+        _, keys = self._persist(**self.params)
+        self.assertEqual(keys, list(BATCH_KEYS) + ['mixed_precision', 'xla'])
+
+    def test_missing_key(self):
+        del self.params['lr']
+        with self.assertRaises(KeyError):
+            snapshot_persist(self.target_dir, **self.params)
+
+    def test_requires_strict_superset(self):
+        del self.params['ckpt_dir']
+        with self.assertRaises(KeyError):
+            snapshot_persist(self.target_dir, **self.params)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,234 @@
+'''Tests datasets.scripts.tfrecords2 module
+
+    Created on Oct 15, 2026
+
+'''
+import unittest
+from unittest import mock
+import os, sys
+import tempfile
+sys.path.insert(0, os.getcwd())
+
+import numpy as np
+import tensorflow as tf
+
+from datasets.scripts import tfrecords2
+from datasets.scripts.tfrecords2 import _pad_to_boundary_fn
+
+BUCKET_BOUNDARIES = [4, 8]
+NUM_CLASSES = 4
+VOCAB_SIZE = 10
+CNF_DICT = {
+    'FORM': {'type': 'text', 'size': 1},
+    'T': {'type': 'choice', 'size': 1, 'dims': NUM_CLASSES},
+    'INDEX': {'type': 'int', 'size': 1}
+}
+
+
+def _write_records(file_path, propositions):
+    '''Writes propositions as SequenceExamples
+
+    Arguments:
+        file_path {str} -- tfrecords file to be written
+        propositions {list<dict>} -- FORM, T and INDEX lists of equal length
+    '''
+    with tf.python_io.TFRecordWriter(file_path) as writer:
+        for column_dict in propositions:
+            context = {'L': tf.train.Feature(int64_list=tf.train.Int64List(
+                value=[len(column_dict['INDEX'])]))}
+            feature_lists = tfrecords2.make_feature_list(
+                {key: [[v] for v in values] for key, values in column_dict.items()},
+                'glo50', 'pt')
+            ex = tf.train.SequenceExample(
+                context=tf.train.Features(feature=context),
+                feature_lists=tf.train.FeatureLists(feature_list=feature_lists)
+            )
+            writer.write(ex.SerializeToString())
+
+
+def _proposition(index, targets):
+    return {
+        'FORM': [(index + t) % VOCAB_SIZE for t in range(len(targets))],
+        'T': targets,
+        'INDEX': [index + t for t in range(len(targets))]
+    }
+
+
+def _read_all(filenames, batch_size, **kwargs):
+    '''Runs the input pipeline over filenames for a single epoch
+
+    Returns:
+        batches {list<tuple>} -- (X, T, L, D) for every batch
+    '''
+    batches = []
+    with tf.Graph().as_default():
+        EMBS = tf.constant(np.eye(VOCAB_SIZE, dtype=np.float32))
+        dataset = tfrecords2.dataset_with_embeddings_fn(
+            EMBS, filenames, batch_size, 1, ['FORM'], ['T'],
+            shuffle=False, **kwargs)
+        X, T, L, D = dataset.make_one_shot_iterator().get_next()
+        # The graph expands the class indices
+        Y = tf.one_hot(T, depth=NUM_CLASSES, axis=2)
+        with tf.Session() as sess:
+            try:
+                while True:
+                    batches.append(sess.run((X, T, L, D, Y)))
+            except tf.errors.OutOfRangeError:
+                pass
+    return batches
+
+
+class RecordsTestCase(unittest.TestCase):
+    '''Writes synthetic propositions into a temporary pt/ directory'''
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.data_dir = os.path.join(self._tmp_dir.name, 'pt')
+        os.makedirs(self.data_dir)
+        patcher = mock.patch.object(
+            tfrecords2.conf, 'get_config', return_value=CNF_DICT)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self._tmp_dir.cleanup)
+
+    def write(self, propositions, part=1):
+        file_path = os.path.join(
+            self.data_dir, 'dbtrain_glo50_{:02d}.tfrecords'.format(part))
+        _write_records(file_path, propositions)
+        return file_path
+
+
+class TargetEncodingTest(RecordsTestCase):
+    '''Targets are int32 class indices padded with -1'''
+
+    def setUp(self):
+        super().setUp()
+        self.filenames = [self.write([
+            _proposition(0, [1, 3]),
+            _proposition(2, [0, 2, 1, 3])
+        ])]
+
+    def test_targets_are_class_indices(self):
+        (X, T, L, D, Y), = _read_all(self.filenames, 2)
+        self.assertEqual(T.dtype, np.int32)
+        self.assertEqual(T.shape, (2, 4))
+        np.testing.assert_array_equal(L, [2, 4])
+        np.testing.assert_array_equal(T[0, :2], [1, 3])
+        np.testing.assert_array_equal(T[1], [0, 2, 1, 3])
+
+    def test_targets_are_padded_with_minus_one(self):
+        (X, T, L, D, Y), = _read_all(self.filenames, 2)
+        np.testing.assert_array_equal(T[0, 2:], [-1, -1])
+
+    def test_one_hot_masks_the_padding(self):
+        (X, T, L, D, Y), = _read_all(self.filenames, 2)
+        self.assertEqual(Y.shape, (2, 4, NUM_CLASSES))
+        np.testing.assert_array_equal(Y[0, :2], np.eye(NUM_CLASSES)[[1, 3]])
+        np.testing.assert_array_equal(Y[1], np.eye(NUM_CLASSES)[[0, 2, 1, 3]])
+        self.assertTrue((Y[0, 2:] == 0.0).all())
+
+
+class ShardTest(RecordsTestCase):
+    '''Replicas read disjoint shards which cover the dataset'''
+
+    def _propositions(self, first, total):
+        # The first INDEX identifies each proposition
+        return [_proposition(10 * p, [p % NUM_CLASSES] * (1 + p % 3))
+                for p in range(first, first + total)]
+
+    def _shards(self, filenames, num_shards):
+        shards = []
+        for shard_index in range(num_shards):
+            batches = _read_all(filenames, 2, num_shards=num_shards,
+                                shard_index=shard_index)
+            shards.append([int(D[i, 0])
+                           for X, T, L, D, Y in batches for i in range(len(L))])
+        return shards
+
+    def _assert_partition(self, filenames, dataset_size, num_shards):
+        shards = self._shards(filenames, num_shards)
+        indices = [index for shard in shards for index in shard]
+        self.assertEqual(len(indices), len(set(indices)))
+        self.assertEqual(sorted(indices), [10 * p for p in range(dataset_size)])
+        for shard_index, shard in enumerate(shards):
+            shard_size = tfrecords2.get_shard_size(
+                filenames, dataset_size, num_shards=num_shards,
+                shard_index=shard_index)
+            self.assertEqual(len(shard), shard_size)
+
+    def test_file_shards(self):
+        filenames = [self.write(self._propositions(3 * part, 3), part=part)
+                     for part in range(4)]
+        self._assert_partition(filenames, 12, 2)
+
+    def test_uneven_file_shards(self):
+        filenames = [self.write(self._propositions(0, 2), part=0),
+                     self.write(self._propositions(2, 3), part=1),
+                     self.write(self._propositions(5, 4), part=2)]
+        self._assert_partition(filenames, 9, 2)
+
+    def test_record_shards(self):
+        filenames = [self.write(self._propositions(0, 7))]
+        self._assert_partition(filenames, 7, 2)
+
+    def test_record_shards_over_files(self):
+        filenames = [self.write(self._propositions(0, 4), part=1),
+                     self.write(self._propositions(4, 4), part=2)]
+        self._assert_partition(filenames, 8, 3)
+
+
+class PadToBoundaryTest(unittest.TestCase):
+    '''Batches are padded on the time axis up to the next boundary'''
+
+    def _run(self, time):
+        with tf.Graph().as_default():
+            padding_values = (
+                tf.constant(0, dtype=tf.float32),
+                tf.constant(-1, dtype=tf.int32),
+                tf.constant(0, dtype=tf.int32),
+                tf.constant(0, dtype=tf.int64)
+            )
+            X = tf.placeholder(tf.float32, shape=(None, None, 3))
+            T = tf.placeholder(tf.int32, shape=(None, None))
+            L = tf.placeholder(tf.int32, shape=(None,))
+            D = tf.placeholder(tf.int64, shape=(None, None))
+
+            pad_fn = _pad_to_boundary_fn(BUCKET_BOUNDARIES, padding_values)
+            tensors = pad_fn(X, T, L, D)
+            self.assertEqual(tensors[0].shape.as_list(), [None, None, 3])
+
+            feed_dict = {
+                X: np.ones((2, time, 3), dtype=np.float32),
+                T: np.ones((2, time), dtype=np.int32),
+                L: np.array([time, time], dtype=np.int32),
+                D: np.ones((2, time), dtype=np.int64)
+            }
+            with tf.Session() as sess:
+                return sess.run(tensors, feed_dict=feed_dict)
+
+    def test_pads_to_next_boundary(self):
+        X, T, L, D = self._run(5)
+        self.assertEqual(X.shape, (2, 8, 3))
+        self.assertEqual(T.shape, (2, 8))
+        self.assertEqual(D.shape, (2, 8))
+        np.testing.assert_array_equal(L, [5, 5])
+
+    def test_padding_values(self):
+        X, T, L, D = self._run(5)
+        self.assertTrue((X[:, 5:] == 0.0).all())
+        self.assertTrue((T[:, 5:] == -1).all())
+        self.assertTrue((D[:, 5:] == 0).all())
+        self.assertTrue((T[:, :5] == 1).all())
+
+    def test_at_boundary(self):
+        X, T, L, D = self._run(4)
+        self.assertEqual(X.shape, (2, 4, 3))
+
+    def test_beyond_last_boundary(self):
+        X, T, L, D = self._run(10)
+        self.assertEqual(X.shape, (2, 10, 3))
+        self.assertEqual(T.shape, (2, 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,25 @@ import json
 
 from config import INPUT_DIR
 
+# Parameters persisted on params.json
+SNAPSHOT_KEYS = frozenset({
+    'input_labels', 'target_labels',
+    'hidden_layers', 'embeddings_model',
+    'embeddings_trainable', 'epochs',
+    'lr', 'batch_size', 'kfold', 'version',
+    'rec_unit', 'chunks', 'recon_depth', 'lang',
+    'stack'})
+
+# Persisted on params.json only when provided -- older
+# snapshots lack them and fall back to the agent's defaults
+OPTIONAL_KEYS = frozenset({'xla', 'mixed_precision'})
+
+# Clear exclusve parameters -- sorted to keep params.json deterministic
+KFOLD_KEYS = tuple(sorted(SNAPSHOT_KEYS - {'batch_size'}))
+BATCH_KEYS = tuple(sorted(SNAPSHOT_KEYS - {'kfold'}))
+KFOLD_KEYS_SET = frozenset(KFOLD_KEYS)
+BATCH_KEYS_SET = frozenset(BATCH_KEYS)
+
 def snapshot_hparam_string(embeddings_model='glo50', target_labels='T',
                       is_batch=True, learning_rate=5 * 1e-3,
                       version='1.0',hidden_layers=[16] * 4, **kwargs):
@@ -94,30 +113,21 @@ def snapshot_persist(target_dir,  **kwargs):
     timestamp = timestamp.strftime('%Y-%m-%d %H%M%S')
     target_dir += '{:}/'.format(timestamp)
 
-    if not os.path.isdir(target_dir):
-        os.makedirs(target_dir)
+    os.makedirs(target_dir, exist_ok=True)
 
     target_path = '{:}params.json'.format(target_dir)
 
-    KEYS = {'input_labels', 'target_labels',
-            'hidden_layers', 'embeddings_model',
-            'embeddings_trainable', 'epochs',
-            'lr', 'batch_size', 'kfold', 'version',
-            'rec_unit', 'chunks', 'recon_depth', 'lang',
-            'stack'}
-
-    # Clear exclusve parameters
     if 'kfold' in kwargs:
-        keys_set = KEYS - {'batch_size'}
+        keys_list, keys_set = KFOLD_KEYS, KFOLD_KEYS_SET
     else:
-        keys_set = KEYS - {'kfold'}
+        keys_list, keys_set = BATCH_KEYS, BATCH_KEYS_SET
 
-    if keys_set < kwargs.keys():  # issubset
-        keys_list = sorted(list(keys_set))
-    else:
+    if not kwargs.keys() > keys_set:  # issubset
         raise KeyError('Missing items: {:}'.format(keys_set - kwargs.keys()))
 
     params_dict = {key: kwargs[key] for key in keys_list}
+    for key in sorted(OPTIONAL_KEYS & kwargs.keys()):
+        params_dict[key] = kwargs[key]
 
     with open(target_path, mode='w') as f:
         json.dump(params_dict, f)